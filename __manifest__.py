@@ -6,20 +6,30 @@
     "website": "https://github.com/OCA/account-invoicing",
     "license": "LGPL-3",
     "depends": [
-        "account", "account_edi", "base", "account_accountant", 'l10n_ec_edi'
+        "account", "account_edi", "base", "account_accountant", 'l10n_ec_edi', "mail"
     ],
     "data": [
         "security/ir.model.access.csv",
         "security/security.xml",
         "data/payment_method_data.xml",
         "data/sequence_data.xml",
+        "data/ir_cron_data.xml",
+        "data/mail_activity_data.xml",
         "views/menu_root.xml",
         "views/res_config_settings_views.xml",
         "views/account_credit_card_authorizer_view.xml",
         "views/payment_view.xml",
         "views/recap_view.xml",
+        "views/credit_card_voucher_register_view.xml",
         "views/retention_credit_card.xml",
+        "views/credit_card_liquidation_import_view.xml",
+        "views/credit_card_liquidation_match_view.xml",
+        "views/credit_card_liquidation_cancel_view.xml",
         "views/credit_card_liquidation_view.xml",
+        "views/credit_card_rate_view.xml",
+        "views/credit_card_liquidation_job_view.xml",
+        "views/credit_card_settlement_report_view.xml",
+        "views/credit_card_liquidation_stats_view.xml",
         "report/report.xml",
         "report/report_credit_card_liquidation.xml",
         "report/report_account_move_tc.xml",
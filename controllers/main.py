@@ -0,0 +1,30 @@
+import tempfile
+
+from werkzeug.wsgi import wrap_file
+
+from odoo import http
+from odoo.http import content_disposition, request
+
+# Exports larger than this are spooled to disk instead of memory
+_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+
+class CreditCardLiquidationController(http.Controller):
+
+    @http.route("/l10n_ec_liquitadion_credit_card/liquidation/lines.csv", type="http", auth="user")
+    def export_liquidation_lines(self, ids="", **kwargs):
+        liquidation_ids = [int(liquidation_id) for liquidation_id in ids.split(",") if liquidation_id.isdigit()]
+        liquidations = request.env["account.credit.card.liquidation"].browse(liquidation_ids).exists()
+        liquidations.check_access_rights("read")
+        liquidations.check_access_rule("read")
+        output = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+        liquidations._export_lines_csv(output)
+        output.seek(0)
+        filename = "%s.csv" % (len(liquidations) == 1 and liquidations.number or "credit_card_liquidations")
+        return request.make_response(
+            wrap_file(request.httprequest.environ, output),
+            headers=[
+                ("Content-Type", "text/csv; charset=utf-8"),
+                ("Content-Disposition", content_disposition(filename)),
+            ],
+        )
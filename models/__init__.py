@@ -2,3 +2,13 @@ from . import credit_card_liquidation
 from . import payment
 from . import res_config_settings
 from . import res_company
+from . import credit_card_liquidation_job
+from . import credit_card_liquidation_stats
+from . import credit_card_file_mixin
+from . import credit_card_liquidation_import
+from . import credit_card_liquidation_match
+from . import credit_card_liquidation_cancel
+from . import credit_card_voucher_register
+from . import credit_card_rate
+from . import account_tax
+from . import credit_card_settlement_report
@@ -0,0 +1,57 @@
+from odoo import api, models
+
+# Fields read by the cached withhold rates and accounts of the liquidations
+_WITHHOLD_TAX_FIELDS = {
+    "amount",
+    "amount_type",
+    "price_include",
+    "include_base_amount",
+    "children_tax_ids",
+    "invoice_repartition_line_ids",
+    "refund_repartition_line_ids",
+    "tax_group_id",
+}
+_WITHHOLD_REPARTITION_FIELDS = {"account_id", "factor_percent", "repartition_type"}
+
+
+class AccountTax(models.Model):
+    _inherit = "account.tax"
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Withhold accounts and rates of the liquidations are cached, a
+        # deleted tax is never looked up again so unlink keeps the cache
+        now = self.env.cr.now()
+        if _WITHHOLD_TAX_FIELDS.intersection(vals) and any(tax.create_date != now for tax in self):
+            self.clear_caches()
+        return res
+
+
+class AccountTaxRepartitionLine(models.Model):
+    _inherit = "account.tax.repartition.line"
+
+    def _affects_cached_withhold_taxes(self):
+        # Taxes created in this transaction, like a chart of accounts being
+        # installed, can't be in the cache yet
+        now = self.env.cr.now()
+        return any(line.tax_id and line.tax_id.create_date != now for line in self)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        if res._affects_cached_withhold_taxes():
+            self.clear_caches()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        if _WITHHOLD_REPARTITION_FIELDS.intersection(vals) and self._affects_cached_withhold_taxes():
+            self.clear_caches()
+        return res
+
+    def unlink(self):
+        clear = self._affects_cached_withhold_taxes()
+        res = super().unlink()
+        if clear:
+            self.clear_caches()
+        return res
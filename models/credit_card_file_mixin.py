@@ -0,0 +1,44 @@
+import base64
+import io
+
+from odoo import api, models
+
+
+class CreditCardFileImportMixin(models.AbstractModel):
+    _name = "account.credit.card.file.mixin"
+    _description = "Credit Card File Import"
+
+    # Accepted CSV headers for each value, set by every wizard
+    _CSV_COLUMNS = {}
+
+    def _open_file_stream(self):
+        """Text stream over the uploaded ``file``, read line by line."""
+        self.ensure_one()
+        return io.TextIOWrapper(io.BytesIO(base64.b64decode(self.file)), encoding="utf-8-sig", errors="replace")
+
+    @api.model
+    def _get_csv_positions(self, header):
+        """Column of each value of ``_CSV_COLUMNS`` found in the CSV ``header``."""
+        header = [column.strip().lower() for column in header]
+        positions = {}
+        for field, aliases in self._CSV_COLUMNS.items():
+            for alias in aliases:
+                if alias in header:
+                    positions[field] = header.index(alias)
+                    break
+        return positions
+
+    @api.model
+    def _parse_amount(self, value):
+        value = (value or "").strip().replace(" ", "")
+        if not value:
+            return 0.0
+        if "," in value and "." in value:
+            # The last separator is the decimal one
+            if value.rfind(",") > value.rfind("."):
+                value = value.replace(".", "").replace(",", ".")
+            else:
+                value = value.replace(",", "")
+        elif "," in value:
+            value = value.replace(",", ".")
+        return float(value)
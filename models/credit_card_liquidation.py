@@ -1,17 +1,56 @@
+import csv
+import io
+import json
 import logging
+import os
 import re
 import calendar
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
-from odoo import api, fields, models, Command
+from odoo import api, fields, models, tools, Command
+from odoo.modules.module import get_module_path
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools import float_compare
+from odoo.tools import float_compare, split_every
 from odoo.tools.translate import _
 
 _logger = logging.getLogger(__name__)
 
+_CSV_EXPORT_BATCH_SIZE = 1000
+
 _STATES_DOC = {"done": [("readonly", True)], "cancel": [("readonly", True)]}
 
+_AMOUNT_FIELDS = (
+    "base",
+    "commission",
+    "commission_iva",
+    "iva_withhold",
+    "rent_base",
+    "rent_withhold",
+    "net_value",
+)
+
+
+def _confirm_partition(command, source, environ, liquidation_ids):
+    """Confirm one partition of liquidations in its own ``odoo shell`` process."""
+    environ = dict(environ, L10N_EC_LIQUIDATION_IDS=",".join(str(x) for x in liquidation_ids))
+    result = subprocess.run(command, input=source, env=environ, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode == 0 and lines:
+        try:
+            return json.loads(lines[-1])
+        except ValueError:
+            pass
+    error = result.stderr.strip().splitlines()[-1:] or ["exit code %s" % result.returncode]
+    _logger.error("Credit card liquidations %s could not be confirmed: %s", liquidation_ids, error[0])
+    return {
+        "done": [],
+        "failed": [{"id": liquidation_id, "error": error[0]} for liquidation_id in liquidation_ids],
+    }
+
 
 class AccountCreditCardLiquidation(models.Model):
     _name = "account.credit.card.liquidation"
@@ -124,9 +163,9 @@ class AccountCreditCardLiquidation(models.Model):
     )
 
     tax_id_ret = fields.Many2one('account.tax', string='Income Tax',
-                                 default=lambda self: self.env.user.company_id.tax_id_ret_liquidation.id)
+                                 default=lambda self: self._get_default_withhold_taxes(self.env.company.id)[0])
     tax_id_vat = fields.Many2one('account.tax', string='VAT',
-                                 default=lambda self: self.env.user.company_id.tax_id_vat_liquidation.id)
+                                 default=lambda self: self._get_default_withhold_taxes(self.env.company.id)[1])
     commission_wo_invoice = fields.Float(
         string="Commission without Invoice", states=_STATES_DOC
     )
@@ -167,6 +206,28 @@ class AccountCreditCardLiquidation(models.Model):
         states=_STATES_DOC,
     )
 
+    job_ids = fields.One2many(
+        comodel_name="account.credit.card.liquidation.job",
+        inverse_name="liquidation_id",
+        string="Background Jobs",
+        readonly=True,
+    )
+    job_state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="Background Confirmation",
+        compute="_compute_job_state",
+    )
+
+    @api.depends("job_ids.state")
+    def _compute_job_state(self):
+        for liquidation in self:
+            liquidation.job_state = liquidation.job_ids[:1].state
+
     @api.depends(
         "line_ids.base",
         "line_ids.commission",
@@ -182,30 +243,61 @@ class AccountCreditCardLiquidation(models.Model):
         "additional_lines_ids.rent_base",
         "additional_lines_ids.rent_withhold",
         "additional_lines_ids.net_value",
+        "commission_wo_invoice",
     )
     def _compute_liquidation_values(self):
+        totals = {}
+        if len(self) > 1 and all(isinstance(liquidation_id, int) for liquidation_id in self.ids):
+            totals = self._read_liquidation_totals()
         for liquidation in self:
-            base = liquidation._get_lines_values("base")
-            commission = liquidation._get_lines_values("commission")
-            commission_iva = liquidation._get_lines_values("commission_iva")
-            iva_withhold = liquidation._get_lines_values("iva_withhold")
-            rent_base = liquidation._get_lines_values("rent_base")
-            rent_withhold = liquidation._get_lines_values("rent_withhold")
-            net_value = liquidation._get_lines_values("net_value") - liquidation.commission_wo_invoice
-            liquidation._set_values(base, commission, commission_iva, iva_withhold, rent_base, rent_withhold, net_value)
-
-    def _get_lines_values(self, field):
-        return sum(self.line_ids.filtered(lambda x: not x.skip_payment).mapped(field)) + sum(
-            self.additional_lines_ids.mapped(field))
-
-    def _set_values(self, base, commission, commission_iva, iva_withhold, rent_base, rent_withhold, net_value):
-        self.base = base
-        self.commission = commission
-        self.commission_iva = commission_iva
-        self.iva_withhold = iva_withhold
-        self.rent_base = rent_base
-        self.rent_withhold = rent_withhold
-        self.net_value = net_value
+            values = totals.get(liquidation.id) or liquidation._get_lines_totals()
+            values["net_value"] -= liquidation.commission_wo_invoice
+            liquidation.update(values)
+
+    def _get_lines_totals(self):
+        """Sum the amounts of the lines in a single pass over them."""
+        self.ensure_one()
+        totals = dict.fromkeys(_AMOUNT_FIELDS, 0.0)
+        for lines in (self.line_ids.filtered(lambda x: not x.skip_payment), self.additional_lines_ids):
+            for line in lines:
+                for field in _AMOUNT_FIELDS:
+                    totals[field] += line[field]
+        return totals
+
+    def _read_liquidation_totals(self):
+        """Sum the amounts of the lines of several liquidations with one query.
+
+        :return: dict mapping liquidation ids to their totals
+        """
+        line_model = self.env["account.credit.card.liquidation.line"]
+        line_model.flush_model(list(_AMOUNT_FIELDS) + ["liquidation_id", "skip_payment"])
+        self.flush_model(["additional_lines_ids"])
+        relation = self._fields["additional_lines_ids"]
+        sums = ", ".join(
+            "COALESCE(SUM(lines.%s) FILTER (WHERE lines.counted), 0.0)" % field for field in _AMOUNT_FIELDS
+        )
+        columns = ", ".join("line.%s" % field for field in _AMOUNT_FIELDS)
+        self.env.cr.execute(
+            f"""
+            SELECT lines.liquidation_id, {sums}
+              FROM (
+                    SELECT line.liquidation_id, NOT COALESCE(line.skip_payment, FALSE) AS counted, {columns}
+                      FROM account_credit_card_liquidation_line line
+                     WHERE line.liquidation_id = ANY(%s)
+                 UNION ALL
+                    SELECT rel.{relation.column1}, TRUE, {columns}
+                      FROM {relation.relation} rel
+                      JOIN account_credit_card_liquidation_line line ON line.id = rel.{relation.column2}
+                     WHERE rel.{relation.column1} = ANY(%s)
+              ) lines
+          GROUP BY lines.liquidation_id
+            """,
+            [self.ids, self.ids],
+        )
+        return {
+            row[0]: dict(zip(_AMOUNT_FIELDS, map(float, row[1:])))
+            for row in self.env.cr.fetchall()
+        }
 
     base = fields.Float(
         string="Base",
@@ -337,200 +429,645 @@ class AccountCreditCardLiquidation(models.Model):
         filled_number = '-'.join(filled_parts)
         return filled_number
 
+    def _read_invoice_counterpart_lines(self):
+        """Receivable and payable items of the invoices to reconcile.
+
+        Read with a single query for all the liquidations, without loading
+        the other journal items of the invoices.
+
+        :return: dict mapping invoice ids to a list of (item id, residual)
+        """
+        invoices = self.invoice_id | self.line_invoice_ids.invoice_id
+        if not invoices:
+            return {}
+        partner_by_invoice = {invoice.id: invoice.partner_id.id for invoice in invoices}
+        lines = self.env["account.move.line"].search_read(
+            [
+                ("move_id", "in", invoices.ids),
+                ("account_type", "in", ("asset_receivable", "liability_payable")),
+                ("partner_id", "in", list(set(partner_by_invoice.values()))),
+            ],
+            ["move_id", "partner_id", "amount_residual_currency"],
+        )
+        counterpart_lines = {invoice_id: [] for invoice_id in invoices.ids}
+        for line in lines:
+            invoice_id = line["move_id"][0]
+            if line["partner_id"][0] == partner_by_invoice[invoice_id]:
+                counterpart_lines[invoice_id].append((line["id"], line["amount_residual_currency"]))
+        return counterpart_lines
+
+    def _check_liquidation_data(self, counterpart_lines=None):
+        """Validate header, lines and invoices to reconcile in a single pass.
+
+        Returns the invoices to reconcile keyed by invoice id and whether the
+        liquidation reconciles several invoices.
+
+        :param counterpart_lines: result of ``_read_invoice_counterpart_lines``
+            when it was already read for a batch of liquidations
+        """
+        self.ensure_one()
+        if self.state != "draft":
+            raise UserError(_("Only draft liquidations can be confirmed"))
+        if not self.line_ids:
+            raise UserError(_("You must enter at least one line"))
+        if (not self.invoice_id
+                and not self.line_invoice_ids
+                and not self.no_invoice):
+            raise UserError(
+                _("You must select a single way to reconcile invoices, either multiple or a single invoice to record the document"))
+        if (self.invoice_id and self.line_invoice_ids and not self.no_invoice):
+            raise UserError(
+                _("You must select a single way to reconcile invoices, either multiple or a single invoice. Please make sure not to have both options selected at the same time"))
+        if self.split_lines_by_recap and not self.no_invoice:
+            raise UserError(_("You can't split journal items with commission value"))
+        if not self.partner_id.property_account_payable_id:
+            raise UserError(
+                _("You must configure the supplier payment account"))
+        if not self.no_withhold:
+            self._check_withhold_data()
+        if counterpart_lines is None:
+            counterpart_lines = self._read_invoice_counterpart_lines()
+
+        def invoice_residual(invoice):
+            return abs(sum(residual for dummy, residual in counterpart_lines.get(invoice.id, [])))
+
+        msg = []
+        invoice_to_liquidate = {}
+        multi_invoice = False
+        if self.invoice_id:
+            residual = invoice_residual(self.invoice_id)
+            invoice_to_liquidate[self.invoice_id.id] = {
+                "amount_to_concile": residual,
+                "amls_to_concile": [],
+                # A commission not matching the invoice is reconciled with
+                # it alone, so it doesn't settle invoices of other liquidations
+                "partial": float_compare(
+                    self.commission + self.commission_iva, residual, precision_digits=2
+                ) != 0,
+            }
+        for iline in self.line_invoice_ids:
+            multi_invoice = True
+            residual = invoice_residual(iline.invoice_id)
+            if float_compare(iline.amount, residual, precision_digits=2) > 0:
+                msg.append(f"The amount {iline.amount} exceeds the "
+                           f"residual amount of the invoice {iline.invoice_id.display_name}, which is {residual}")
+            invoice_to_liquidate[iline.invoice_id.id] = {
+                "amount_to_concile": iline.amount,
+                "amls_to_concile": [],
+                # Invoices only partially paid keep their own reconciliation
+                "partial": float_compare(iline.amount, residual, precision_digits=2) < 0,
+            }
+        if msg:
+            msg = "\n".join(msg)
+            raise UserError(_("Restrictions: %s") % (msg))
+        if multi_invoice and not self.no_invoice:
+            total_comission = (self.commission_iva or 0.0) + (self.commission + 0.0)
+            total_to_concile = sum(
+                [v["amount_to_concile"] for v in invoice_to_liquidate.values()]
+            )
+            if float_compare(total_to_concile, total_comission, precision_digits=2) != 0:
+                raise UserError(
+                    _("The amount to reconcile from the invoices %s does not match the commission and VAT values %s")
+                    % (total_to_concile, total_comission)
+                )
+        if not self.no_invoice:
+            for invoice_id, invoice_values in invoice_to_liquidate.items():
+                invoice_values["amls_to_concile"] = [
+                    line_id for line_id, dummy in counterpart_lines.get(invoice_id, [])
+                ]
+        return invoice_to_liquidate, multi_invoice
+
     def action_done(self):
-        retention_model = self.env["account.move"]
-        rline_model = self.env["account.move.line"]
+        with self.env["account.credit.card.liquidation.stats"]._profile("liquidation.action_done", self):
+            self._confirm_liquidations(raise_on_error=True)
+        return True
+
+    def action_done_multi(self):
+        report = self._confirm_liquidations()
+        message = _("%(done)s liquidations confirmed, %(failed)s failed.") % {
+            "done": len(report["done"]),
+            "failed": len(report["failed"]),
+        }
+        if report["failed"]:
+            message += "\n" + "\n".join(
+                "%s: %s" % (failure["number"], failure["error"]) for failure in report["failed"]
+            )
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Credit Card Liquidations"),
+                "message": message,
+                "type": "warning" if report["failed"] else "success",
+                "sticky": bool(report["failed"]),
+                "next": {"type": "ir.actions.client", "tag": "reload"},
+            },
+        }
+
+    def action_compute_fees(self):
+        """Fill the fees and withholds of the lines from the rate table.
+
+        Every line is computed in one pass and stored with grouped writes,
+        lines without an applicable rate are left untouched.
+        """
+        rate_model = self.env["account.credit.card.rate"]
+        precision = self.env["decimal.precision"].precision_get("Account")
+        lines = self.filtered(lambda x: x.state == "draft").line_ids
+        index = rate_model._get_rate_index(set(lines.recap_id.authorizer_id.ids), self.company_id)
+        today = fields.Date.context_today(self)
+        line_ids, bases, rates, missing = [], [], [], []
+        for line in lines:
+            rate = rate_model._find_rate(
+                index,
+                line.liquidation_id.company_id.id,
+                line.recap_id.authorizer_id.id,
+                line.issuer_id.id,
+                line.card_type,
+                line.liquidation_id.date_account or today,
+            )
+            if not rate:
+                missing.append(line.recap_id.name or line.description or str(line.id))
+                continue
+            line_ids.append(line.id)
+            bases.append(line.base)
+            rates.append(rate)
+        if line_ids:
+            amounts = rate_model._compute_line_amounts(bases, rates, precision)
+            rate_model._write_line_amounts(lines.browse(line_ids), amounts)
+        if not missing:
+            return True
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Credit Card Rates"),
+                "message": _("There is no rate for the RECAPs: %s") % ", ".join(missing),
+                "type": "warning",
+                "sticky": True,
+                "next": {"type": "ir.actions.client", "tag": "reload"},
+            },
+        }
+
+    def action_done_async(self):
+        """Enqueue the confirmation of the liquidations on the background job queue."""
+        job_model = self.env["account.credit.card.liquidation.job"]
+        to_enqueue = self.filtered(
+            lambda x: x.state == "draft" and x.job_state not in ("pending", "running")
+        )
+        for liquidation in to_enqueue:
+            liquidation._check_liquidation_data()
+        if to_enqueue:
+            job_model.create([{"liquidation_id": liquidation.id} for liquidation in to_enqueue])
+            job_model._trigger_cron()
+        return True
+
+    def action_print_liquidation(self):
+        """Print the liquidation report, or export the lines as CSV when
+        there are too many of them to render a PDF."""
+        threshold = int(self.env["ir.config_parameter"].sudo().get_param(
+            "l10n_ec_liquitadion_credit_card.report_csv_threshold", 5000
+        ))
+        line_count = self.env["account.credit.card.liquidation.line"].search_count(
+            [("liquidation_id", "in", self.ids)]
+        )
+        if line_count > threshold:
+            return self.action_export_lines_csv()
+        return self.env.ref(
+            "l10n_ec_liquitadion_credit_card.action_report_credit_card_liquidation_pdf"
+        ).report_action(self)
+
+    def action_export_lines_csv(self):
+        return {
+            "type": "ir.actions.act_url",
+            "url": "/l10n_ec_liquitadion_credit_card/liquidation/lines.csv?ids=%s"
+                   % ",".join(str(liquidation_id) for liquidation_id in self.ids),
+            "target": "self",
+        }
+
+    def _export_lines_csv(self, output):
+        """Write the lines of the liquidations as CSV into the binary ``output``.
+
+        Lines are read and written in chunks and the cache is cleared after
+        each one, so memory use doesn't grow with the number of lines.
+        """
+        line_model = self.env["account.credit.card.liquidation.line"]
+        columns = ["liquidation_id", "recap_id", "description", "issuer_id", "card_type"] + list(_AMOUNT_FIELDS)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([line_model._fields[column].string for column in columns])
+        line_ids = line_model.search([("liquidation_id", "in", self.ids)], order="liquidation_id, id").ids
+        for chunk in split_every(_CSV_EXPORT_BATCH_SIZE, line_ids):
+            for line in line_model.browse(chunk).read(columns):
+                writer.writerow([
+                    value[1] if isinstance(value, tuple) else ("" if value is False else value)
+                    for value in (line[column] for column in columns)
+                ])
+            output.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            line_model.invalidate_model()
+        output.write(buffer.getvalue().encode("utf-8"))
+
+    def _get_confirmation_partitions(self):
+        """Split the liquidations in groups that can be confirmed in parallel.
+
+        Liquidations are joined (union-find) when they post on the same
+        journal, share a RECAP or an invoice to reconcile, or take their
+        number from a no-gap sequence of the same company, so no two groups
+        ever lock the same rows.
+
+        :return: list of lists of liquidation ids, the largest first
+        """
+        parents = {}
+
+        def find(node):
+            parents.setdefault(node, node)
+            while parents[node] != node:
+                parents[node] = parents[parents[node]]
+                node = parents[node]
+            return node
+
+        sequences = {}
+        for liquidation in self:
+            company = liquidation.company_id or self.env.company
+            if company not in sequences:
+                sequences[company] = self._get_liquidation_sequence(company)
+            keys = [
+                ("journal", liquidation.journal_id.id),
+                ("journal", liquidation.journal_ret_id.id),
+            ]
+            keys += [
+                ("recap", recap_id)
+                for recap_id in (liquidation.line_ids.recap_id | liquidation.additional_lines_ids.recap_id).ids
+            ]
+            keys += [
+                ("invoice", invoice_id)
+                for invoice_id in (liquidation.invoice_id | liquidation.line_invoice_ids.invoice_id).ids
+            ]
+            if sequences[company].implementation == "no_gap":
+                keys.append(("sequence", sequences[company].id))
+            root = find(("liquidation", liquidation.id))
+            for key in keys:
+                if key[1]:
+                    parents[find(key)] = root
+        partitions = {}
+        for liquidation in self:
+            partitions.setdefault(find(("liquidation", liquidation.id)), []).append(liquidation.id)
+        return sorted(partitions.values(), key=len, reverse=True)
+
+    def _get_confirmation_worker_command(self):
+        """Command line of an ``odoo shell`` worker on the current database."""
+        command = [sys.executable, sys.argv[0], "shell", "-d", self.env.cr.dbname, "--no-http"]
+        if tools.config.rcfile and os.path.exists(tools.config.rcfile):
+            command += ["-c", tools.config.rcfile]
+        return command + ["--addons-path", tools.config["addons_path"]]
+
+    def _run_partitioned_confirmation(self, workers=None):
+        """Confirm the draft liquidations with several worker processes.
+
+        The liquidations are split with ``_get_confirmation_partitions`` and
+        each partition is confirmed and committed by its own ``odoo shell``
+        process running ``scripts/confirm_liquidation_partition.py``, with
+        its own registry and cursor. Meant to be run from ``odoo shell``:
+        the current transaction is committed before the workers start.
+
+        :param workers: number of processes, the CPU count by default
+        :return: merged report of every partition, with the ``done``
+            liquidation ids and the ``failed`` ones
+        """
+        started = time.monotonic()
+        partitions = self.filtered(lambda x: x.state == "draft")._get_confirmation_partitions()
+        workers = max(min(workers or os.cpu_count() or 1, len(partitions)), 1)
+        summary = {"done": [], "failed": [], "partitions": len(partitions), "workers": workers}
+        if self.env.registry.in_test_mode() or workers == 1:
+            reports = [self.browse(ids)._confirm_liquidations() for ids in partitions]
+        else:
+            self.env.cr.commit()
+            command = self._get_confirmation_worker_command()
+            script = os.path.join(get_module_path("l10n_ec_liquitadion_credit_card"),
+                                  "scripts", "confirm_liquidation_partition.py")
+            with open(script, encoding="utf-8") as script_file:
+                source = script_file.read()
+            environ = dict(
+                os.environ,
+                L10N_EC_UID=str(self.env.uid),
+                L10N_EC_CONTEXT=json.dumps(self.env.context, default=str),
+            )
+            # The threads only wait on the worker processes, they never use the cursor
+            with ThreadPoolExecutor(workers) as executor:
+                reports = list(executor.map(
+                    lambda ids: _confirm_partition(command, source, environ, ids), partitions
+                ))
+            self.env.invalidate_all()
+        for report in reports:
+            summary["done"] += report["done"]
+            summary["failed"] += report["failed"]
+        summary["duration"] = round(time.monotonic() - started, 2)
+        _logger.info(
+            "Confirmed %s credit card liquidations in %s partitions with %s workers, %s failed, %.2fs",
+            len(summary["done"]), summary["partitions"], workers, len(summary["failed"]), summary["duration"],
+        )
+        return summary
+
+    def _confirm_liquidations(self, raise_on_error=False):
+        """Confirm several liquidations at once.
+
+        All the liquidations are validated up front, their numbers are taken
+        from the sequence in one batch and the withholds and journal entries
+        of the valid ones are created and posted together. When the grouped
+        confirmation fails, every liquidation is confirmed again inside its
+        own savepoint so a wrong document doesn't roll back the others.
+
+        :param raise_on_error: raise the first error found instead of
+            reporting it
+        :return: dict with the ``done`` liquidation ids and the ``failed``
+            ones as dicts with ``id``, ``number`` and ``error``
+        """
+        report = {"done": [], "failed": []}
+        invoice_data = {}
+        to_confirm = self.browse()
+        counterpart_lines = self._read_invoice_counterpart_lines()
+        for liquidation in self:
+            try:
+                invoice_data[liquidation.id] = liquidation._check_liquidation_data(counterpart_lines)
+            except UserError as error:
+                if raise_on_error:
+                    raise
+                report["failed"].append(liquidation._prepare_confirmation_failure(error))
+                continue
+            to_confirm |= liquidation
+        if not to_confirm:
+            return report
+        to_confirm._assign_liquidation_numbers()
+        if raise_on_error:
+            to_confirm._post_liquidations(invoice_data)
+            report["done"] = to_confirm.ids
+            return report
+        if len(to_confirm) > 1:
+            try:
+                with self.env.cr.savepoint():
+                    to_confirm._post_liquidations(invoice_data)
+                report["done"] = to_confirm.ids
+                return report
+            except Exception:
+                _logger.info("Grouped confirmation of %s liquidations failed, "
+                             "confirming them one by one", len(to_confirm), exc_info=True)
+        for liquidation in to_confirm:
+            try:
+                with self.env.cr.savepoint():
+                    liquidation._post_liquidations(invoice_data)
+            except Exception as error:
+                _logger.warning("Credit card liquidation %s could not be confirmed",
+                                liquidation.number, exc_info=True)
+                report["failed"].append(liquidation._prepare_confirmation_failure(error))
+                continue
+            report["done"].append(liquidation.id)
+        return report
+
+    def _prepare_confirmation_failure(self, error):
+        self.ensure_one()
+        return {
+            "id": self.id,
+            "number": self.number,
+            "error": str(error),
+        }
+
+    def _assign_liquidation_numbers(self):
+        liquidations_by_company = {}
+        for liquidation in self.filtered(lambda x: x.number == "/"):
+            company = liquidation.company_id or self.env.company
+            liquidations_by_company.setdefault(company, self.browse())
+            liquidations_by_company[company] |= liquidation
+        for company, liquidations in liquidations_by_company.items():
+            sequence = self._get_liquidation_sequence(company)
+            if not sequence:
+                raise UserError(_("There is no sequence defined for credit card liquidations"))
+            numbers = self._get_next_sequence_numbers(sequence, len(liquidations))
+            for liquidation, number in zip(liquidations, numbers):
+                liquidation.number = number
+
+    @api.model
+    def _get_liquidation_sequence(self, company):
+        return self.env["ir.sequence"].search(
+            [
+                ("code", "=", "credit.card.liquidation"),
+                ("company_id", "in", [company.id, False]),
+            ],
+            order="company_id",
+            limit=1,
+        )
+
+    @api.model
+    def _get_next_sequence_numbers(self, sequence, count):
+        """Reserve ``count`` numbers of ``sequence`` with a single query."""
+        if sequence.implementation != "standard" or sequence.use_date_range or count == 1:
+            return [sequence._next() for dummy in range(count)]
+        self.env.cr.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            ("ir_sequence_%03d" % sequence.id, count),
+        )
+        return [sequence.get_next_char(number) for number in sorted(r[0] for r in self.env.cr.fetchall())]
+
+    def _post_liquidations(self, invoice_data):
         am_model = self.env["account.move"]
-        invoice_model = self.env["account.move"]
+        stats_model = self.env["account.credit.card.liquidation.stats"]
+        to_withhold = self.filtered(lambda x: not x.no_withhold)
+        with stats_model._profile("liquidation.withhold", to_withhold):
+            to_withhold._generate_withholds()
+        # Each entry is created with all its items at once, balance is checked
+        # a single time per entry instead of on every journal item
+        with stats_model._profile("liquidation.move", self):
+            prepared = [
+                liquidation._prepare_liquidation_move_vals(*invoice_data[liquidation.id])
+                for liquidation in self
+            ]
+            moves = am_model.create([move_vals for move_vals, dummy in prepared])
+            moves.action_post()
+        to_reconcile = []
+        for liquidation, move, (dummy, line_indexes) in zip(self, moves, prepared):
+            liquidation.move_id = move
+            invoice_to_liquidate = invoice_data[liquidation.id][0]
+            if liquidation.no_invoice or not invoice_to_liquidate:
+                continue
+            # Journal items keep the creation order, map back the
+            # commission lines to the invoice they have to reconcile
+            move_lines = move.line_ids.sorted("id")
+            for invoice_id, invoice_values in invoice_to_liquidate.items():
+                aml_ids = invoice_values["amls_to_concile"] + [
+                    move_lines[index].id for index in line_indexes.get(invoice_id, [])
+                ]
+                to_reconcile.append((invoice_values.get("partial") and invoice_id, aml_ids))
+        with stats_model._profile("liquidation.reconcile", self):
+            self._reconcile_move_lines(to_reconcile)
+        self.write({"state": "done"})
+
+    @api.model
+    def _reconcile_move_lines(self, to_reconcile):
+        """Reconcile the journal items of many invoices and liquidations at once.
+
+        Items are grouped by account and partner and each group is reconciled
+        with a single call. Invoices paid partially are kept in a group of
+        their own, so the commission goes to the invoice it was allocated to.
+
+        :param to_reconcile: list of (invoice id or False, journal item ids)
+        """
         aml_model = self.env["account.move.line"]
-        seq_model = self.env["ir.sequence"]
-        for liquidation in self:
-            if not liquidation.line_ids:
-                raise UserError(_("You must enter at least one line"))
-            if (not liquidation.invoice_id
-                    and not liquidation.line_invoice_ids
-                    and not liquidation.no_invoice):
-                raise UserError(
-                    _("You must select a single way to reconcile invoices, either multiple or a single invoice to record the document"))
-            if (liquidation.invoice_id and liquidation.line_invoice_ids and not liquidation.no_invoice):
-                raise UserError(
-                    _("You must select a single way to reconcile invoices, either multiple or a single invoice. Please make sure not to have both options selected at the same time"))
-            if liquidation.split_lines_by_recap and not liquidation.no_invoice:
-                raise UserError(_("You can't split journal items with commission value"))
-            msg = []
-            for iline in liquidation.line_invoice_ids:
-                if iline.amount > iline.invoice_id.amount_residual:
-                    msg.append(f"The amount {iline.amount} exceeds the "
-                               f"residual amount of the invoice {iline.invoice_id.display_name}, which is {iline.invoice_id.amount_residual}")
-            if msg:
-                msg = "\n".join(msg)
-                raise UserError(_("Restrictions: %s") % (msg))
-            invoice_to_liquidate = {}
-            multi_invoice = False
-            if liquidation.invoice_id:
-                invoice_to_liquidate[liquidation.invoice_id.id] = {
-                    "amount_to_concile": liquidation.invoice_id.amount_residual,
-                    "amls_to_concile": [],
-                }
-            for iline in liquidation.line_invoice_ids:
-                multi_invoice = True
-                invoice_to_liquidate[iline.invoice_id.id] = {
-                    "amount_to_concile": iline.amount,
-                    "amls_to_concile": [],
-                }
-            total_comission = (liquidation.commission_iva or 0.0) + (
-                    liquidation.commission + 0.0
+        # Load every journal item at once before grouping them
+        aml_model.browse([aml_id for dummy, aml_ids in to_reconcile for aml_id in aml_ids]).read(
+            ["account_id", "partner_id", "reconciled"]
+        )
+        groups = {}
+        for invoice_key, aml_ids in to_reconcile:
+            for line in aml_model.browse(aml_ids):
+                if line.reconciled:
+                    continue
+                key = (line.account_id.id, line.partner_id.commercial_partner_id.id, invoice_key)
+                groups.setdefault(key, aml_model)
+                groups[key] |= line
+        for lines in groups.values():
+            if len(lines) > 1:
+                lines.reconcile()
+
+    def action_generate_withholds(self):
+        to_withhold = self.filtered(
+            lambda x: x.state == "done" and not x.no_withhold and not x.withhold_id
+        )
+        for liquidation in to_withhold:
+            liquidation._check_withhold_data()
+        to_withhold._generate_withholds()
+        return True
+
+    def _generate_withholds(self):
+        """Create the withholds of the liquidations with one create and post them together.
+
+        The withhold accounts come from the tax cache and the journal
+        sequences are handled by a single posting of the whole set.
+        """
+        if not self:
+            return self.env["account.move"]
+        withholds = self.env["account.move"].create([
+            liquidation._prepare_withhold_vals() for liquidation in self
+        ])
+        withholds.action_post()
+        for liquidation, withhold in zip(self, withholds):
+            liquidation.withhold_id = withhold
+        return withholds
+
+    def _check_withhold_data(self):
+        self.ensure_one()
+        if not self.journal_ret_id or not self.tax_id_ret or not self.tax_id_vat:
+            raise UserError(
+                _("You must set the withhold journal and taxes of the liquidation %s") % self.number
             )
-            if multi_invoice:
-                total_to_concile = sum(
-                    [v["amount_to_concile"] for v in invoice_to_liquidate.values()]
-                )
-                if (
-                        float_compare(total_to_concile, total_comission, precision_digits=2)
-                        != 0
-                        and not liquidation.no_invoice
-                ):
-                    raise UserError(
-                        _("The amount to reconcile from the invoices %s does not match the commission and VAT values %s")
-                        % (total_to_concile, ((liquidation.commission_iva or 0.0) + (liquidation.commission + 0.0)),)
-                    )
-            if not liquidation.no_withhold:
-                vals = self._prepare_withhold_header()
-                total_lines = self._prepare_withhold_move_lines()
-                vals['line_ids'] = [Command.create(vals) for vals in total_lines]
-                withhold = self.env['account.move'].create(vals)
-                withhold.action_post()
-                self.withhold_id = withhold
-
-            if not liquidation.no_invoice:
-                for invoice_id in invoice_to_liquidate.keys():
-                    invoice = invoice_model.browse(invoice_id)
-                    for line in invoice.line_ids:
-                        if (line.account_id.account_type
-                                in ["asset_receivable", "liability_payable"]
-                                and line.partner_id
-                                and line.partner_id.id == invoice.partner_id.id):
-                            invoice_to_liquidate[invoice_id]["amls_to_concile"].append(
-                                line.id
-                            )
-            number_liquidation = liquidation.number
-            if liquidation.number == "/":
-                number_liquidation = seq_model.next_by_code("credit.card.liquidation")
-            am = am_model.create({
-                "name": "/",
-                "ref": "Credit Card Liquidation %s" % (number_liquidation),
-                "journal_id": liquidation.journal_id.id,
-                "date": liquidation.date_account, }
+
+    def _prepare_liquidation_move_vals(self, invoice_to_liquidate, multi_invoice):
+        """Values of the liquidation entry and the commission line indexes by invoice."""
+        self.ensure_one()
+        line_vals_list, line_indexes = self._prepare_liquidation_move_lines(
+            self.number, invoice_to_liquidate, multi_invoice
+        )
+        move_vals = {
+            "name": "/",
+            "ref": "Credit Card Liquidation %s" % (self.number),
+            "journal_id": self.journal_id.id,
+            "date": self.date_account,
+            "line_ids": [Command.create(vals) for vals in line_vals_list],
+        }
+        return move_vals, line_indexes
+
+    def _prepare_liquidation_move_lines(self, number_liquidation, invoice_to_liquidate, multi_invoice):
+        """Build the values of every journal item of the liquidation entry.
+
+        The position of the commission lines is returned by invoice id, so
+        they can be reconciled against their invoice once the entry is
+        created. ``invoice_to_liquidate`` is left untouched, a retry of the
+        same liquidation builds its entry from scratch.
+        """
+        self.ensure_one()
+        line_vals_list = []
+        line_indexes = {}
+        partner = self.partner_id
+        name_recap = " Recaps " + " - ".join(str(e) for e in self.line_ids.mapped("recap_id").mapped("name"))
+        if self.base:
+            base = self.base
+            if not self.no_withhold:
+                amount_line = ((self.rent_withhold or 0.0)
+                               + (self.iva_withhold or 0.0))
+                base = base - amount_line
+            name = _("Base of Credit Card Liquidation %s") % (number_liquidation) + name_recap
+            line_vals_list.append(
+                self._prepare_move_line_vals(self.account_id, name, credit=base, partner=partner)
             )
-            if not liquidation.partner_id.property_account_payable_id:
-                raise UserError(
-                    _("You must configure the supplier payment account"))
-            base = 0.0
-            name_recap = " Recaps " + " - ".join(str(e) for e in liquidation.line_ids.mapped("recap_id").mapped("name"))
-            if liquidation.base:
-                base = liquidation.base
-                if not liquidation.no_withhold:
-                    amount_line = ((liquidation.rent_withhold or 0.0)
-                                   + (liquidation.iva_withhold or 0.0))
-                    base = base - amount_line
-
-                name = _("Base of Credit Card Liquidation %s") % (number_liquidation) + name_recap
-                aml_model.with_context(check_move_validity=False).create(
-                    liquidation._prepare_move_line_vals(am, liquidation.account_id, name, credit=base,
-                                                        partner=liquidation.partner_id, )
-                )
-            if liquidation.commission_wo_invoice > 0 and not liquidation.no_invoice:
-                name = _("Commission without Invoice Credit Card %s") % (number_liquidation) + name_recap
-                aml_model.with_context(check_move_validity=False).create(
-                    liquidation._prepare_move_line_vals(am, liquidation.partner_id.property_account_payable_id, name,
-                                                        credit=liquidation.commission_wo_invoice,
-                                                        partner=liquidation.partner_id, )
+        if self.commission_wo_invoice > 0 and not self.no_invoice:
+            name = _("Commission without Invoice Credit Card %s") % (number_liquidation) + name_recap
+            line_vals_list.append(
+                self._prepare_move_line_vals(partner.property_account_payable_id, name,
+                                             credit=self.commission_wo_invoice, partner=partner)
+            )
+        if self.commission or self.commission_iva:
+            account_id = partner.property_account_payable_id
+            if self.no_invoice:
+                account_id = self.account_commission_id
+            for invoice_id, invoice_data in invoice_to_liquidate.items():
+                amount_line = (self.commission_iva or 0.0) + (self.commission + 0.0)
+                if multi_invoice:
+                    amount_line = invoice_data.get("amount_to_concile", 0.0)
+                name = _("Commission Credit Card Liquidation %s") % (number_liquidation) + name_recap
+                line_indexes.setdefault(invoice_id, []).append(len(line_vals_list))
+                line_vals_list.append(
+                    self._prepare_move_line_vals(account_id, name, debit=amount_line, partner=partner)
                 )
-            if liquidation.commission or liquidation.commission_iva:
-                for invoice_id in invoice_to_liquidate.keys():
-                    amount_line = (liquidation.commission_iva or 0.0) + (liquidation.commission + 0.0)
-                    account_id = liquidation.partner_id.property_account_payable_id
-                    if liquidation.no_invoice:
-                        account_id = liquidation.account_commission_id
-                    if multi_invoice:
-                        amount_line = invoice_to_liquidate[invoice_id].get("amount_to_concile", 0.0)
-                    name = _("Commission Credit Card Liquidation %s" % (number_liquidation) + name_recap)
-                    aml = aml_model.with_context(check_move_validity=False).create(
-                        liquidation._prepare_move_line_vals(am, account_id,
-                                                            name, debit=amount_line, partner=liquidation.partner_id, ))
-                    if not liquidation.no_invoice:
-                        invoice_to_liquidate[invoice_id]["amls_to_concile"].append(aml.id)
-            # Create grouped entries or per recap
-            # depending on what the user has selected
-            if liquidation.split_lines_by_recap:
-                for line in liquidation.line_ids:
-                    payment_account_id = liquidation.journal_id.default_debit_account_id
-                    name = _("Net Value Credit Card Liquidation: %s Recap: %s") % (
-                        number_liquidation, line.recap_id.name or "",)
-                    aml_model.with_context(check_move_validity=False).create(
-                        liquidation._prepare_move_line_vals(am, payment_account_id, name, debit=line.net_value,
-                                                            partner=liquidation.partner_id, ))
-
-            elif liquidation.net_value:
-                pmls = liquidation.journal_id.inbound_payment_method_line_ids
-                default_payment_account = liquidation.company_id.account_journal_payment_debit_account_id
-
-                payment_account_id = pmls.payment_account_id[:1] or default_payment_account
-
-                name = (_("Net Value Credit Card Liquidation %s") % (number_liquidation) + name_recap)
-                value = liquidation.net_value
-                aml_model.with_context(check_move_validity=False).create(
-                    liquidation._prepare_move_line_vals(
-                        am,
-                        payment_account_id,
-                        name,
-                        debit=value,
-                        partner=liquidation.partner_id,
-                    )
+        # Create grouped entries or per recap
+        # depending on what the user has selected
+        pmls = self.journal_id.inbound_payment_method_line_ids
+        default_payment_account = self.company_id.account_journal_payment_debit_account_id
+        payment_account_id = pmls.payment_account_id[:1] or default_payment_account
+        if self.split_lines_by_recap:
+            for line in self.line_ids:
+                name = _("Net Value Credit Card Liquidation: %s Recap: %s") % (
+                    number_liquidation, line.recap_id.name or "",)
+                line_vals_list.append(
+                    self._prepare_move_line_vals(payment_account_id, name, debit=line.net_value, partner=partner)
                 )
+        elif self.net_value:
+            name = (_("Net Value Credit Card Liquidation %s") % (number_liquidation) + name_recap)
+            line_vals_list.append(
+                self._prepare_move_line_vals(payment_account_id, name, debit=self.net_value, partner=partner)
+            )
+        if self.no_withhold and self.rent_withhold > 0:
+            name = _("Income Tax Withholding Credit Card %s") % (number_liquidation) + name_recap
+            line_vals_list.append(
+                self._prepare_move_line_vals(self.account_withhold_rent_id, name,
+                                             debit=self.rent_withhold, partner=partner)
+            )
+        if self.no_withhold and self.iva_withhold > 0:
+            name = _("VAT Withholding Credit Card %s") % (number_liquidation) + name_recap
+            line_vals_list.append(
+                self._prepare_move_line_vals(self.account_withhold_iva_id, name,
+                                             debit=self.iva_withhold, partner=partner)
+            )
+        return line_vals_list, line_indexes
 
-            if liquidation.no_withhold and liquidation.rent_withhold > 0:
-                name = _("Income Tax Withholding Credit Card %s") % (number_liquidation) + name_recap
-                aml_model.with_context(check_move_validity=False).create(
-                    liquidation._prepare_move_line_vals(am, liquidation.account_withhold_rent_id, name,
-                                                        debit=liquidation.rent_withhold,
-                                                        partner=liquidation.partner_id, ))
-            if liquidation.no_withhold and liquidation.iva_withhold > 0:
-                name = _("VAT Withholding Credit Card %s") % (number_liquidation) + name_recap
-                aml_model.with_context(check_move_validity=False).create(
-                    liquidation._prepare_move_line_vals(am, liquidation.account_withhold_iva_id, name,
-                                                        debit=liquidation.iva_withhold,
-                                                        partner=liquidation.partner_id, ))
-            am.action_post()
-            if not liquidation.no_invoice and invoice_to_liquidate:
-                for invoice_id in invoice_to_liquidate.keys():
-                    aml_model_ids = aml_model.browse(
-                        invoice_to_liquidate[invoice_id]["amls_to_concile"]
-                    )
-                    for account_con_id in aml_model_ids.mapped('account_id'):
-                        aml_model_ids.filtered(lambda x: x.account_id == account_con_id).reconcile()
-
-            update_data = {
-                "number": number_liquidation,
-                "move_id": am.id,
-                "state": "done",
-            }
-            liquidation.reconcile_invoice()
-            liquidation.write(update_data)
-        return True
-
-    def _prepare_move_line_vals(self, move, account, name, debit=0, credit=0, partner=False):
+    def _prepare_move_line_vals(self, account, name, debit=0, credit=0, partner=False):
         return {
-            "move_id": move.id,
             "account_id": account.id,
             "name": name,
-            "analytic_distribution": self.account_analytic_id.id,
+            "analytic_distribution": (
+                {self.account_analytic_id.id: 100} if self.account_analytic_id else False
+            ),
             "debit": debit,
             "credit": credit,
             "partner_id": partner.id if partner else False,
         }
 
+    def _prepare_withhold_vals(self):
+        self.ensure_one()
+        vals = self._prepare_withhold_header()
+        vals["line_ids"] = [Command.create(line_vals) for line_vals in self._prepare_withhold_move_lines()]
+        return vals
+
     def _prepare_withhold_header(self):
+        self.ensure_one()
         vals = {
             'date': self.date_account,
             'l10n_ec_withhold_date': self.date_account,
@@ -544,6 +1081,23 @@ class AccountCreditCardLiquidation(models.Model):
         }
         return vals
 
+    @api.model
+    @tools.ormcache("company_id")
+    def _get_default_withhold_taxes(self, company_id):
+        company = self.env["res.company"].sudo().browse(company_id)
+        return company.tax_id_ret_liquidation.id, company.tax_id_vat_liquidation.id
+
+    @api.model
+    @tools.ormcache("company_id", "tax_id")
+    def _get_withhold_tax_data(self, company_id, tax_id):
+        """Rate and account of a withholding tax, resolved once per company.
+
+        The cache is cleared when the tax fields it reads or the repartition
+        lines of existing taxes change.
+        """
+        tax = self.env["account.tax"].sudo().with_company(company_id).browse(tax_id)
+        return self._tax_compute_all_helper(1.0, tax)
+
     @api.model
     def _tax_compute_all_helper(self, base, tax_id):
         taxes_res = tax_id.compute_all(
@@ -575,7 +1129,7 @@ class AccountCreditCardLiquidation(models.Model):
     def _prepare_withhold_move_lines(self):
         total_lines = []
 
-        dummy, account = self._tax_compute_all_helper(1.0, self.tax_id_ret)
+        dummy, account = self._get_withhold_tax_data(self.company_id.id, self.tax_id_ret.id)
         vals_base_line = {
             **self._get_move_line_default_values(self.rent_base, False),
             'name': 'Base Ret: ' + self.tax_id_ret.name,
@@ -589,7 +1143,7 @@ class AccountCreditCardLiquidation(models.Model):
         }
         total_lines.append(vals_base_line_counterpart)
         total_lines.append(vals_base_line)
-        dummy, account = self._tax_compute_all_helper(1.0, self.tax_id_vat)
+        dummy, account = self._get_withhold_tax_data(self.company_id.id, self.tax_id_vat.id)
         base_vat = self.base - (self.base / 1.12)
         vals_base_line = {
             **self._get_move_line_default_values(base_vat, False),
@@ -615,19 +1169,41 @@ class AccountCreditCardLiquidation(models.Model):
         return total_lines
 
     def action_cancel(self):
-        for liquidation in self:
-            liquidation.move_ids.remove_move_reconcile()
-            if liquidation.move_id:
-                if liquidation.move_id.state == "posted":
-                    liquidation.move_id.button_cancel()
-                liquidation.move_id.unlink()
-            if liquidation.withhold_id:
-                if liquidation.withhold_id.state == "posted":
-                    liquidation.withhold_id.button_cancel()
-                liquidation.withhold_id.unlink()
-            liquidation.write({"state": "cancel"})
+        with self.env["account.credit.card.liquidation.stats"]._profile("liquidation.action_cancel", self):
+            self._cancel_liquidations()
         return True
 
+    def _cancel_liquidations(self, reverse=False, date=None):
+        """Cancel the draft and done liquidations together.
+
+        Every reconciliation of their journal entries and withholds is
+        removed at once. The entries are then deleted, or reversed on
+        ``date`` when ``reverse`` is set so they stay in the audit trail.
+        The state is written once, so the totals of the RECAPs are
+        recomputed in a single grouped pass.
+        """
+        liquidations = self.filtered(lambda x: x.state != "cancel")
+        moves = liquidations.move_id | liquidations.withhold_id
+        moves.line_ids.remove_move_reconcile()
+        posted_moves = moves.filtered(lambda x: x.state == "posted")
+        if reverse and posted_moves:
+            posted_moves._reverse_moves(
+                [
+                    {
+                        "date": date or fields.Date.context_today(self),
+                        "ref": _("Reversal of: %s") % (move.ref or move.name),
+                    }
+                    for move in posted_moves
+                ],
+                cancel=True,
+            )
+            (moves - posted_moves).unlink()
+        else:
+            posted_moves.button_cancel()
+            moves.unlink()
+        liquidations.write({"state": "cancel"})
+        self.env["account.payment.recap"].flush_model(["amount_total", "amount_not_reconciled"])
+
     def action_cancel_to_draft(self):
         self.write({"state": "draft"})
 
@@ -637,23 +1213,12 @@ class AccountCreditCardLiquidation(models.Model):
                 raise UserError(_("You can not delete a credit card liquidation, try canceling it first"))
         return super(AccountCreditCardLiquidation, self).unlink()
 
-    def reconcile_invoice(self):
-        for rec in self:
-            if rec.invoice_id.state == "open":
-                for aml in rec.move_ids:
-                    if (
-                            aml.partner_id.commercial_partner_id.id == rec.invoice_id.commercial_partner_id.id
-                            and rec.invoice_id.account_id.id == aml.account_id.id
-                            and aml.amount_residual != 0
-                    ):
-                        rec.invoice_id.register_payment(aml)
-
 
 class AccountCreditCardLiquidationLine(models.Model):
     _name = "account.credit.card.liquidation.line"
 
     recap_id = fields.Many2one(domain=[("amount_not_reconciled", ">", 0)], comodel_name="account.payment.recap",
-                               string="Lote / RECAP"
+                               string="Lote / RECAP", index=True
                                )
 
     liquidation_id = fields.Many2one(
@@ -661,6 +1226,7 @@ class AccountCreditCardLiquidationLine(models.Model):
         string="Credit Card Liquidation",
         required=True,
         ondelete="cascade",
+        index=True,
     )
     description = fields.Char(string="Description", index=True)
     move_line_id = fields.Many2one(
@@ -674,6 +1240,16 @@ class AccountCreditCardLiquidationLine(models.Model):
     rent_base = fields.Float(string="Rent Base", digits="Account")
     rent_withhold = fields.Float(string="Rent Withhold", digits="Account")
     skip_payment = fields.Boolean(string="Skip Payment?")
+    issuer_id = fields.Many2one(
+        comodel_name="account.credit.card.issuer", string="Credit Card Issuer"
+    )
+    card_type = fields.Selection(
+        selection=[
+            ("credit", "Credit"),
+            ("debit", "Debit"),
+        ],
+        string="Card Type",
+    )
 
     @api.depends(
         "base", "commission", "commission_iva", "iva_withhold", "rent_withhold"
@@ -705,17 +1281,12 @@ class AccountCreditCardLiquidationLine(models.Model):
         "rent_withhold",
     )
     def onchange_amounts(self):
+        # net_value is computed by _compute_net_value
         for rec in self:
-            rec.net_value = rec.base - (
-                    rec.commission
-                    + rec.commission_iva
-                    + rec.iva_withhold
-                    + rec.rent_withhold
-            )
             if (
                     rec.recap_id
                     and float_compare(
-                rec.recap_id.amount_not_reconciled, self.base, precision_digits=2
+                rec.recap_id.amount_not_reconciled, rec.base, precision_digits=2
             )
                     == -1
             ):
@@ -737,7 +1308,7 @@ class AccountCreditCardLiquidationLine(models.Model):
     def onchange_recap_id(self):
         for rec in self:
             if rec.recap_id:
-                rec.base = self.recap_id.amount_not_reconciled
+                rec.base = rec.recap_id.amount_not_reconciled
 
 
 class AccountCreditCardLiquidationInvoiceDetail(models.Model):
@@ -0,0 +1,46 @@
+from odoo import api, fields, models, Command
+from odoo.exceptions import UserError
+from odoo.tools.translate import _
+
+
+class AccountCreditCardLiquidationCancel(models.TransientModel):
+    _name = "account.credit.card.liquidation.cancel"
+    _description = "Cancel Credit Card Liquidations"
+
+    liquidation_ids = fields.Many2many(
+        comodel_name="account.credit.card.liquidation",
+        string="Credit Card Liquidations",
+        required=True,
+    )
+    mode = fields.Selection(
+        selection=[
+            ("delete", "Delete the journal entries"),
+            ("reverse", "Reverse the journal entries"),
+        ],
+        string="Journal Entries",
+        required=True,
+        default="reverse",
+    )
+    date = fields.Date(
+        string="Reversal Date",
+        default=fields.Date.context_today,
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        result = super().default_get(fields_list)
+        if self._context.get("active_model") == "account.credit.card.liquidation" and self._context.get("active_ids"):
+            result.setdefault("liquidation_ids", [Command.set(self._context["active_ids"])])
+        return result
+
+    def action_cancel(self):
+        self.ensure_one()
+        liquidations = self.liquidation_ids.filtered(lambda x: x.state == "done")
+        if not liquidations:
+            raise UserError(_("Only done liquidations can be cancelled"))
+        if self.mode == "reverse" and not self.date:
+            raise UserError(_("You must set the date of the reversal entries"))
+        stats_model = self.env["account.credit.card.liquidation.stats"]
+        with stats_model._profile("liquidation.action_cancel", liquidations):
+            liquidations._cancel_liquidations(reverse=self.mode == "reverse", date=self.date)
+        return {"type": "ir.actions.act_window_close"}
@@ -0,0 +1,218 @@
+import csv
+import logging
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+from odoo.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+_IMPORT_BATCH_SIZE = 1000
+
+_IMPORT_FIELDS = (
+    "base",
+    "commission",
+    "commission_iva",
+    "iva_withhold",
+    "rent_base",
+    "rent_withhold",
+)
+
+
+class AccountCreditCardLiquidationImport(models.TransientModel):
+    _name = "account.credit.card.liquidation.import"
+    _inherit = "account.credit.card.file.mixin"
+    _description = "Import Credit Card Settlement File"
+
+    # Accepted CSV headers for each value of the liquidation lines
+    _CSV_COLUMNS = {
+        "recap": ("recap", "lote", "batch", "lote/recap"),
+        "base": ("base", "valor", "monto", "amount"),
+        "commission": ("commission", "comision"),
+        "commission_iva": ("commission_iva", "iva_comision", "iva comision"),
+        "iva_withhold": ("iva_withhold", "ret_iva", "retencion iva"),
+        "rent_base": ("rent_base", "base_renta", "base renta"),
+        "rent_withhold": ("rent_withhold", "ret_renta", "retencion renta", "ret_fuente"),
+    }
+    # Fixed width statements, (start, end) positions of each value per acquirer
+    _FIXED_WIDTH_LAYOUTS = {
+        "datafast": {
+            "recap": (0, 10),
+            "base": (10, 25),
+            "commission": (25, 40),
+            "commission_iva": (40, 55),
+            "iva_withhold": (55, 70),
+            "rent_base": (70, 85),
+            "rent_withhold": (85, 100),
+        },
+        "medianet": {
+            "recap": (0, 12),
+            "base": (12, 27),
+            "commission": (27, 42),
+            "commission_iva": (42, 57),
+            "iva_withhold": (57, 72),
+            "rent_base": (72, 87),
+            "rent_withhold": (87, 102),
+        },
+    }
+
+    liquidation_id = fields.Many2one(
+        comodel_name="account.credit.card.liquidation",
+        string="Credit Card Liquidation",
+        required=True,
+        ondelete="cascade",
+    )
+    journal_id = fields.Many2one(
+        comodel_name="account.journal",
+        string="Card Journal",
+        required=True,
+        domain=[("is_payment_tc", "=", True)],
+    )
+    file = fields.Binary(string="Settlement File", required=True)
+    filename = fields.Char(string="File Name")
+    file_format = fields.Selection(
+        selection=[
+            ("csv", "CSV"),
+            ("fixed", "Fixed Width"),
+        ],
+        string="Format",
+        required=True,
+        default="csv",
+    )
+    delimiter = fields.Char(string="Delimiter", size=1, default=",")
+    layout = fields.Selection(
+        selection=[
+            ("datafast", "Datafast"),
+            ("medianet", "Medianet"),
+        ],
+        string="Layout",
+        default="datafast",
+    )
+    skip_header = fields.Boolean(string="Skip First Line", default=True)
+    state = fields.Selection(
+        selection=[
+            ("draft", "Draft"),
+            ("done", "Done"),
+        ],
+        default="draft",
+    )
+    lines_created = fields.Integer(string="Lines Created", readonly=True)
+    result = fields.Text(string="Mismatches", readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        result = super().default_get(fields_list)
+        if self._context.get("active_model") == "account.credit.card.liquidation" and self._context.get("active_id"):
+            result.setdefault("liquidation_id", self._context["active_id"])
+        return result
+
+    def action_import(self):
+        self.ensure_one()
+        if self.liquidation_id.state != "draft":
+            raise UserError(_("Settlement files can only be imported on draft liquidations"))
+        line_model = self.env["account.credit.card.liquidation.line"]
+        recaps = self._get_recap_index()
+        mismatches = []
+        batch = []
+        created = 0
+        for row_number, values in self._iter_rows():
+            recap = recaps.get(values["recap"])
+            if not recap:
+                mismatches.append(
+                    _("Line %s: RECAP %s is not open on journal %s")
+                    % (row_number, values["recap"], self.journal_id.name)
+                )
+                continue
+            if float_compare(values["base"], recap["amount_not_reconciled"], precision_digits=2) != 0:
+                mismatches.append(
+                    _("Line %s: RECAP %s base %s does not match the amount not reconciled %s")
+                    % (row_number, values["recap"], values["base"], recap["amount_not_reconciled"])
+                )
+            recap["amount_not_reconciled"] -= values["base"]
+            batch.append(self._prepare_liquidation_line_vals(recap["id"], values))
+            if len(batch) >= _IMPORT_BATCH_SIZE:
+                created += len(line_model.create(batch))
+                batch = []
+        if batch:
+            created += len(line_model.create(batch))
+        _logger.info("Imported %s lines on credit card liquidation %s, %s mismatches",
+                     created, self.liquidation_id.id, len(mismatches))
+        self.write({
+            "state": "done",
+            "lines_created": created,
+            "result": "\n".join(mismatches) or False,
+        })
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _get_recap_index(self):
+        """Open recaps of the journal keyed by number, read with one query."""
+        recaps = self.env["account.payment.recap"].search_read(
+            [
+                ("journal_id", "=", self.journal_id.id),
+                ("state", "!=", "cancel"),
+                ("amount_not_reconciled", ">", 0),
+            ],
+            ["name", "amount_not_reconciled"],
+        )
+        return {recap["name"]: recap for recap in recaps}
+
+    def _prepare_liquidation_line_vals(self, recap_id, values):
+        vals = {
+            "liquidation_id": self.liquidation_id.id,
+            "recap_id": recap_id,
+        }
+        for field in _IMPORT_FIELDS:
+            vals[field] = values[field]
+        return vals
+
+    def _iter_rows(self):
+        """Yield the number and the parsed values of each line of the file.
+
+        The file is read line by line, lines are never loaded all at once.
+        """
+        stream = self._open_file_stream()
+        if self.file_format == "csv":
+            rows = self._iter_csv_rows(stream)
+        else:
+            rows = self._iter_fixed_width_rows(stream)
+        for row_number, raw_values in rows:
+            if not raw_values.get("recap"):
+                continue
+            try:
+                values = {
+                    field: self._parse_amount(raw_values.get(field))
+                    for field in _IMPORT_FIELDS
+                }
+            except ValueError:
+                raise UserError(_("Line %s of the file has an invalid amount") % row_number)
+            values["recap"] = raw_values["recap"].strip()
+            yield row_number, values
+
+    def _iter_csv_rows(self, stream):
+        reader = csv.reader(stream, delimiter=self.delimiter or ",")
+        positions = self._get_csv_positions(next(reader, []))
+        if "recap" not in positions or "base" not in positions:
+            raise UserError(_("The file must have at least the RECAP and base columns"))
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, {
+                field: row[position] if position < len(row) else ""
+                for field, position in positions.items()
+            }
+
+    def _iter_fixed_width_rows(self, stream):
+        layout = self._FIXED_WIDTH_LAYOUTS[self.layout]
+        for row_number, row in enumerate(stream, start=1):
+            if row_number == 1 and self.skip_header:
+                continue
+            if not row.strip():
+                continue
+            yield row_number, {
+                field: row[start:end] for field, (start, end) in layout.items()
+            }
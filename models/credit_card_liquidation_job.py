@@ -0,0 +1,215 @@
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+
+class AccountCreditCardLiquidationJob(models.Model):
+    _name = "account.credit.card.liquidation.job"
+    _description = "Credit Card Liquidation Background Job"
+    _order = "id desc"
+
+    liquidation_id = fields.Many2one(
+        comodel_name="account.credit.card.liquidation",
+        string="Credit Card Liquidation",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+    company_id = fields.Many2one(
+        related="liquidation_id.company_id", store=True
+    )
+    user_id = fields.Many2one(
+        comodel_name="res.users",
+        string="Requested by",
+        required=True,
+        default=lambda self: self.env.user,
+    )
+    state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        string="State",
+        required=True,
+        default="pending",
+        index=True,
+    )
+    attempts = fields.Integer(string="Attempts", readonly=True)
+    max_attempts = fields.Integer(
+        string="Max Attempts",
+        default=lambda self: self._get_job_param("max_attempts"),
+    )
+    error = fields.Text(string="Error", readonly=True)
+    date_enqueued = fields.Datetime(
+        string="Enqueued on", default=fields.Datetime.now, readonly=True
+    )
+    date_next = fields.Datetime(
+        string="Next Attempt", default=fields.Datetime.now, readonly=True
+    )
+    date_started = fields.Datetime(string="Started on", readonly=True)
+    date_finished = fields.Datetime(string="Finished on", readonly=True)
+    duration = fields.Float(string="Duration (s)", readonly=True)
+
+    _JOB_PARAMS = {
+        "chunk_size": 20,
+        "concurrency": 2,
+        "max_attempts": 3,
+        "timeout": 3600,
+    }
+
+    @api.model
+    def _get_job_param(self, key):
+        value = self.env["ir.config_parameter"].sudo().get_param(
+            "l10n_ec_liquitadion_credit_card.job_%s" % key
+        )
+        return int(value or self._JOB_PARAMS[key])
+
+    def action_retry(self):
+        self.filtered(lambda x: x.state == "failed").write({
+            "state": "pending",
+            "attempts": 0,
+            "error": False,
+            "date_next": fields.Datetime.now(),
+        })
+        self._trigger_cron()
+        return True
+
+    @api.model
+    def _trigger_cron(self):
+        cron = self.env.ref(
+            "l10n_ec_liquitadion_credit_card.ir_cron_process_liquidation_jobs",
+            raise_if_not_found=False,
+        )
+        if cron:
+            cron._trigger()
+
+    def _commit(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Confirm the enqueued liquidations, one chunk at a time.
+
+        Jobs are taken with ``SKIP LOCKED`` so several workers can share the
+        queue. Every claim takes up to ``job_chunk_size`` jobs and no more
+        than ``job_concurrency`` chunks run at the same time. Every chunk is
+        committed once processed.
+        """
+        self._requeue_stalled_jobs()
+        while True:
+            jobs = self._acquire_jobs()
+            if not jobs:
+                break
+            self._process_jobs(jobs)
+            self._commit()
+        return True
+
+    @api.model
+    def _requeue_stalled_jobs(self):
+        timeout = timedelta(seconds=self._get_job_param("timeout"))
+        stalled = self.search([
+            ("state", "=", "running"),
+            ("date_started", "<", fields.Datetime.now() - timeout),
+        ])
+        if stalled:
+            _logger.warning("Requeuing %s stalled credit card liquidation jobs", len(stalled))
+            stalled.write({"state": "pending", "date_next": fields.Datetime.now()})
+            self._commit()
+
+    @api.model
+    def _acquire_jobs(self):
+        # Serialize the acquisition so the concurrency limit holds between workers
+        self.env.cr.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (self._table,))
+        self.flush_model()
+        # The jobs of a chunk are claimed in one transaction and share their
+        # start date, so every distinct date is a chunk in flight
+        self.env.cr.execute(
+            """
+            SELECT COUNT(DISTINCT date_started)
+              FROM account_credit_card_liquidation_job
+             WHERE state = 'running'
+            """
+        )
+        available = self._get_job_param("concurrency") - self.env.cr.fetchone()[0]
+        if available <= 0:
+            return self.browse()
+        self.env.cr.execute(
+            """
+            UPDATE account_credit_card_liquidation_job
+               SET state = 'running',
+                   attempts = attempts + 1,
+                   date_started = (now() at time zone 'UTC'),
+                   date_finished = NULL
+             WHERE id IN (
+                SELECT id
+                  FROM account_credit_card_liquidation_job
+                 WHERE state = 'pending'
+                   AND (date_next IS NULL OR date_next <= (now() at time zone 'UTC'))
+              ORDER BY id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+             )
+         RETURNING id
+            """,
+            (self._get_job_param("chunk_size"),),
+        )
+        job_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.invalidate_model()
+        # Make the running state visible to the other workers
+        self._commit()
+        return self.browse(sorted(job_ids))
+
+    def _process_jobs(self, jobs):
+        started = time.monotonic()
+        jobs_by_env = {}
+        for job in jobs:
+            key = (job.user_id, job.liquidation_id.company_id)
+            jobs_by_env.setdefault(key, self.browse())
+            jobs_by_env[key] |= job
+        results = {}
+        for (user, company), user_jobs in jobs_by_env.items():
+            liquidations = user_jobs.liquidation_id.with_user(user)
+            if company:
+                liquidations = liquidations.with_company(company)
+            # A failing group must not roll back the groups already confirmed
+            try:
+                with self.env.cr.savepoint():
+                    report = liquidations._confirm_liquidations()
+            except Exception as error:
+                _logger.exception("Credit card liquidation jobs %s failed", user_jobs.ids)
+                report = {
+                    "done": [],
+                    "failed": [{"id": liquidation.id, "error": str(error)} for liquidation in liquidations],
+                }
+            for liquidation_id in report["done"]:
+                results[liquidation_id] = False
+            for failure in report["failed"]:
+                results[failure["id"]] = failure["error"]
+        duration = time.monotonic() - started
+        now = fields.Datetime.now()
+        for job in jobs:
+            error = results.get(job.liquidation_id.id, _("The liquidation was not processed"))
+            vals = {
+                "date_finished": now,
+                "duration": duration,
+                "error": error or False,
+            }
+            if not error:
+                vals["state"] = "done"
+            elif job.attempts < job.max_attempts:
+                vals.update({
+                    "state": "pending",
+                    "date_next": now + timedelta(minutes=job.attempts),
+                })
+            else:
+                vals["state"] = "failed"
+            job.write(vals)
+        _logger.info("Processed %s credit card liquidation jobs in %.2fs", len(jobs), duration)
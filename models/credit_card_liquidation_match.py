@@ -0,0 +1,176 @@
+import logging
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+# Upper bounds of the partial sums kept and of the partial sums visited
+# by the subset-sum search, beyond them the greedy selection is used
+_MATCH_MAX_STATES = 200000
+_MATCH_MAX_STEPS = 5000000
+
+
+class AccountCreditCardLiquidationMatch(models.TransientModel):
+    _name = "account.credit.card.liquidation.match"
+    _description = "Match RECAPs to Credit Card Liquidation"
+
+    liquidation_id = fields.Many2one(
+        comodel_name="account.credit.card.liquidation",
+        string="Credit Card Liquidation",
+        required=True,
+        ondelete="cascade",
+    )
+    partner_id = fields.Many2one(related="liquidation_id.partner_id")
+    authorizer_id = fields.Many2one(
+        comodel_name="account.credit.card.authorizer",
+        string="Authorizer",
+        domain="[('partner_id', '=', partner_id)]",
+    )
+    journal_id = fields.Many2one(
+        comodel_name="account.journal",
+        string="Card Journal",
+        domain=[("is_payment_tc", "=", True)],
+    )
+    date_from = fields.Date(string="From")
+    date_to = fields.Date(string="To")
+    target_amount = fields.Float(string="Gross Amount", digits="Account", required=True)
+    state = fields.Selection(
+        selection=[
+            ("draft", "Draft"),
+            ("done", "Done"),
+        ],
+        default="draft",
+    )
+    lines_created = fields.Integer(string="Lines Created", readonly=True)
+    difference = fields.Float(string="Difference", digits="Account", readonly=True)
+
+    @api.model
+    def default_get(self, fields_list):
+        result = super().default_get(fields_list)
+        if self._context.get("active_model") == "account.credit.card.liquidation" and self._context.get("active_id"):
+            result.setdefault("liquidation_id", self._context["active_id"])
+        return result
+
+    def action_match(self):
+        self.ensure_one()
+        liquidation = self.liquidation_id
+        if liquidation.state != "draft":
+            raise UserError(_("RECAPs can only be matched on draft liquidations"))
+        candidates = self._get_candidate_recaps()
+        if not candidates:
+            raise UserError(_("There are no open RECAPs for these filters"))
+        target = self._to_cents(self.target_amount)
+        selected = self._select_recaps(candidates, target)
+        if not selected:
+            raise UserError(_("No combination of open RECAPs fits the gross amount"))
+        self.env["account.credit.card.liquidation.line"].create([
+            {
+                "liquidation_id": liquidation.id,
+                "recap_id": recap["id"],
+                "base": recap["amount_not_reconciled"],
+            }
+            for recap in selected
+        ])
+        difference = target - sum(self._to_cents(recap["amount_not_reconciled"]) for recap in selected)
+        self.write({
+            "state": "done",
+            "lines_created": len(selected),
+            "difference": difference / 100.0,
+        })
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def _get_candidate_recaps(self):
+        """Open recaps of the acquirer, oldest first, read with one query."""
+        domain = [
+            ("state", "=", "draft"),
+            ("amount_not_reconciled", ">", 0),
+            ("authorizer_id.partner_id", "=", self.partner_id.id),
+            ("id", "not in", self.liquidation_id.line_ids.recap_id.ids),
+        ]
+        if self.authorizer_id:
+            domain.append(("authorizer_id", "=", self.authorizer_id.id))
+        if self.journal_id:
+            domain.append(("journal_id", "=", self.journal_id.id))
+        if self.date_from:
+            domain.append(("date", ">=", self.date_from))
+        if self.date_to:
+            domain.append(("date", "<=", self.date_to))
+        return self.env["account.payment.recap"].search_read(
+            domain, ["amount_not_reconciled", "date"], order="date, id"
+        )
+
+    @api.model
+    def _to_cents(self, amount):
+        return int(round(amount * 100))
+
+    @api.model
+    def _select_recaps(self, candidates, target):
+        """Pick the recaps that settle ``target`` cents.
+
+        Tried in order: the oldest recaps up to an exact match, an exact
+        subset-sum over the partial sums (bounded by ``_MATCH_MAX_STATES``
+        and ``_MATCH_MAX_STEPS``) and, when no exact combination exists,
+        the oldest recaps that fit in the amount.
+        """
+        amounts = [self._to_cents(recap["amount_not_reconciled"]) for recap in candidates]
+        accumulated = 0
+        for index, amount in enumerate(amounts):
+            accumulated += amount
+            if accumulated == target:
+                return candidates[:index + 1]
+            if accumulated > target:
+                break
+        indexes = self._subset_sum(amounts, target)
+        if indexes is None:
+            indexes = []
+            accumulated = 0
+            for index, amount in enumerate(amounts):
+                if accumulated + amount <= target:
+                    indexes.append(index)
+                    accumulated += amount
+        return [candidates[index] for index in sorted(indexes)]
+
+    @api.model
+    def _subset_sum(self, amounts, target):
+        """Indexes of ``amounts`` adding up exactly to ``target``, if any.
+
+        Every reachable partial sum keeps the previous sum and the index
+        that reached it, so the combination is rebuilt without storing it.
+        Returns None when there's no exact combination, or the search grows
+        beyond ``_MATCH_MAX_STATES`` partial sums or ``_MATCH_MAX_STEPS``
+        visited sums.
+        """
+        reachable = {0: None}
+        steps = 0
+        for index, amount in enumerate(amounts):
+            if amount <= 0 or amount > target:
+                continue
+            steps += len(reachable)
+            if steps > _MATCH_MAX_STEPS:
+                _logger.info("RECAP matching stopped after visiting %s partial sums", steps)
+                return None
+            for partial in list(reachable):
+                new_partial = partial + amount
+                if new_partial <= target and new_partial not in reachable:
+                    reachable[new_partial] = (partial, index)
+            if target in reachable:
+                break
+            if len(reachable) > _MATCH_MAX_STATES:
+                _logger.info("RECAP matching stopped after %s partial sums", len(reachable))
+                return None
+        if target not in reachable:
+            return None
+        indexes = []
+        partial = target
+        while reachable[partial] is not None:
+            partial, index = reachable[partial]
+            indexes.append(index)
+        return indexes
@@ -0,0 +1,70 @@
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+_STATS_BUFFER_KEY = "l10n_ec_liquidation_stats"
+
+
+class AccountCreditCardLiquidationStats(models.Model):
+    _name = "account.credit.card.liquidation.stats"
+    _description = "Credit Card Liquidation Performance Stats"
+    _order = "id desc"
+    _log_access = False
+
+    run_id = fields.Char(string="Run", readonly=True, index=True)
+    date = fields.Datetime(string="Date", readonly=True, default=fields.Datetime.now)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    user_id = fields.Many2one("res.users", string="User", readonly=True)
+    stage = fields.Char(string="Stage", readonly=True)
+    query_count = fields.Integer(string="Queries", readonly=True, group_operator="sum")
+    duration = fields.Float(string="Duration (s)", readonly=True, digits=(16, 4), group_operator="sum")
+    record_count = fields.Integer(string="Records", readonly=True, group_operator="sum")
+
+    @api.model
+    @contextmanager
+    def _profile(self, stage, records):
+        """Measure the queries, wall time and records of a stage.
+
+        Measures are only taken when profiling is enabled on the current
+        company. They are logged right away, kept with the run of the
+        transaction and stored on a cursor of their own once it commits, so
+        the stats add no queries to the measured code and survive the
+        savepoints rolled back in between.
+        """
+        company = self.env.company
+        if not company.l10n_ec_liquidation_profiling:
+            yield
+            return
+        cr = self.env.cr
+        queries = cr.sql_log_count
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            values = {
+                "stage": stage,
+                "query_count": cr.sql_log_count - queries,
+                "duration": round(time.perf_counter() - started, 4),
+                "record_count": len(records),
+                "company_id": company.id,
+                "user_id": self.env.uid,
+            }
+            _logger.info("Credit card liquidation stats: %s", json.dumps(values))
+            run = cr.postcommit.data.get(_STATS_BUFFER_KEY)
+            if run is None:
+                run = cr.postcommit.data[_STATS_BUFFER_KEY] = {"id": uuid.uuid4().hex, "stats": []}
+                cr.postcommit.add(lambda: self._save_stats(run))
+            run["stats"].append(values)
+
+    @api.model
+    def _save_stats(self, run):
+        with self.pool.cursor() as cr:
+            self.with_env(self.env(cr=cr, su=True)).create([
+                dict(values, run_id=run["id"]) for values in run["stats"]
+            ])
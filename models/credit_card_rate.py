@@ -0,0 +1,139 @@
+import logging
+
+from odoo import api, fields, models
+from odoo.tools import float_round
+
+_logger = logging.getLogger(__name__)
+
+_CARD_TYPES = [
+    ("credit", "Credit"),
+    ("debit", "Debit"),
+]
+
+_RATE_FIELDS = (
+    "commission",
+    "commission_iva",
+    "iva_withhold",
+    "rent_base",
+    "rent_withhold",
+)
+
+
+class AccountCreditCardRate(models.Model):
+    _name = "account.credit.card.rate"
+    _description = "Credit Card Settlement Rates"
+    _order = "authorizer_id, date_from desc, id desc"
+
+    company_id = fields.Many2one(
+        comodel_name="res.company",
+        string="Company",
+        default=lambda self: self.env.company,
+    )
+    active = fields.Boolean(default=True)
+    authorizer_id = fields.Many2one(
+        "account.credit.card.authorizer", "Authorizer", required=True, index=True
+    )
+    issuer_id = fields.Many2one(
+        "account.credit.card.issuer", "Credit Card Issuer",
+        help="Leave empty to apply the rate to every issuer of the authorizer",
+    )
+    card_type = fields.Selection(
+        _CARD_TYPES, string="Card Type",
+        help="Leave empty to apply the rate to every card type",
+    )
+    date_from = fields.Date(string="Valid From", required=True, default=fields.Date.context_today)
+    date_to = fields.Date(string="Valid To")
+    vat_rate = fields.Float(string="VAT included in Sales (%)", digits=(16, 4), default=12.0)
+    commission_rate = fields.Float(string="Commission (%)", digits=(16, 4))
+    commission_iva_rate = fields.Float(string="VAT on Commission (%)", digits=(16, 4), default=12.0)
+    iva_withhold_rate = fields.Float(string="VAT Withhold (%)", digits=(16, 4))
+    rent_withhold_rate = fields.Float(string="Income Tax Withhold (%)", digits=(16, 4))
+
+    @api.model
+    def _get_rate_index(self, authorizer_ids, companies):
+        """Rates of the authorizers keyed by (authorizer, issuer, card type).
+
+        Each key holds the rates from the most recent to the oldest one.
+        """
+        rates = self.search_read(
+            [
+                ("authorizer_id", "in", list(authorizer_ids)),
+                ("company_id", "in", companies.ids + [False]),
+            ],
+            [
+                "company_id", "authorizer_id", "issuer_id", "card_type", "date_from", "date_to",
+                "vat_rate", "commission_rate", "commission_iva_rate",
+                "iva_withhold_rate", "rent_withhold_rate",
+            ],
+        )
+        index = {}
+        for rate in rates:
+            key = (
+                rate["authorizer_id"][0],
+                rate["issuer_id"] and rate["issuer_id"][0],
+                rate["card_type"],
+            )
+            index.setdefault(key, []).append(rate)
+        return index
+
+    @api.model
+    def _find_rate(self, index, company_id, authorizer_id, issuer_id, card_type, date):
+        # Most specific rates first, then the ones for any issuer or card type
+        for key in (
+            (authorizer_id, issuer_id, card_type),
+            (authorizer_id, issuer_id, False),
+            (authorizer_id, False, card_type),
+            (authorizer_id, False, False),
+        ):
+            for rate in index.get(key, []):
+                if rate["company_id"] and rate["company_id"][0] != company_id:
+                    continue
+                if rate["date_from"] <= date and (not rate["date_to"] or rate["date_to"] >= date):
+                    return rate
+        return None
+
+    @api.model
+    def _compute_line_amounts(self, bases, rates, precision):
+        """Fees and withholds of many lines, one column at a time.
+
+        :param bases: list of line bases
+        :param rates: list of the rate applied to each line
+        :return: dict of lists, one per amount field, in the same order
+        """
+        rent_bases = [
+            float_round(base / (1 + rate["vat_rate"] / 100.0), precision_digits=precision)
+            for base, rate in zip(bases, rates)
+        ]
+        commissions = [
+            float_round(base * rate["commission_rate"] / 100.0, precision_digits=precision)
+            for base, rate in zip(bases, rates)
+        ]
+        return {
+            "commission": commissions,
+            "commission_iva": [
+                float_round(commission * rate["commission_iva_rate"] / 100.0, precision_digits=precision)
+                for commission, rate in zip(commissions, rates)
+            ],
+            "iva_withhold": [
+                float_round((base - rent_base) * rate["iva_withhold_rate"] / 100.0, precision_digits=precision)
+                for base, rent_base, rate in zip(bases, rent_bases, rates)
+            ],
+            "rent_base": rent_bases,
+            "rent_withhold": [
+                float_round(rent_base * rate["rent_withhold_rate"] / 100.0, precision_digits=precision)
+                for rent_base, rate in zip(rent_bases, rates)
+            ],
+        }
+
+    @api.model
+    def _write_line_amounts(self, lines, amounts):
+        """Store the computed amounts of ``lines`` with one write per distinct set of amounts.
+
+        Lines sharing a rate and a base get the same amounts, so grouping
+        them keeps the number of writes low while going through the ORM.
+        """
+        lines_by_values = {}
+        for line_id, values in zip(lines.ids, zip(*(amounts[field] for field in _RATE_FIELDS))):
+            lines_by_values.setdefault(values, []).append(line_id)
+        for values, line_ids in lines_by_values.items():
+            lines.browse(line_ids).write(dict(zip(_RATE_FIELDS, values)))
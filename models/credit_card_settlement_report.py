@@ -0,0 +1,119 @@
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+_AGE_BUCKETS = [
+    ("0_7", "0-7 days"),
+    ("8_15", "8-15 days"),
+    ("16_30", "16-30 days"),
+    ("31_60", "31-60 days"),
+    ("61_plus", "More than 60 days"),
+]
+
+
+def age_bucket_sql(date_column):
+    """SQL expression giving the age bucket of ``date_column`` at the current date."""
+    return """CASE
+                       WHEN CURRENT_DATE - {0} <= 7 THEN '0_7'
+                       WHEN CURRENT_DATE - {0} <= 15 THEN '8_15'
+                       WHEN CURRENT_DATE - {0} <= 30 THEN '16_30'
+                       WHEN CURRENT_DATE - {0} <= 60 THEN '31_60'
+                       ELSE '61_plus'
+                   END""".format(date_column)
+
+
+class AccountCreditCardSettlementReport(models.Model):
+    _name = "account.credit.card.settlement.report"
+    _description = "Credit Card Settlement Analysis"
+    _auto = False
+    _order = "date desc, id"
+
+    origin = fields.Selection(
+        selection=[
+            ("payment", "Card Payment"),
+            ("liquidation", "Liquidation"),
+        ],
+        string="Origin",
+        readonly=True,
+    )
+    company_id = fields.Many2one("res.company", "Company", readonly=True)
+    date = fields.Date("Date", readonly=True)
+    recap_id = fields.Many2one("account.payment.recap", "Lote / RECAP", readonly=True)
+    recap_date = fields.Date("RECAP Date", readonly=True)
+    authorizer_id = fields.Many2one("account.credit.card.authorizer", "Authorizer", readonly=True)
+    issuer_id = fields.Many2one("account.credit.card.issuer", "Credit Card Issuer", readonly=True)
+    journal_id = fields.Many2one("account.journal", "Card Journal", readonly=True)
+    amount = fields.Float("Pending Amount", digits="Account", readonly=True)
+    age = fields.Integer("Age (days)", readonly=True, group_operator="max")
+    age_bucket = fields.Selection(_AGE_BUCKETS, string="Age", readonly=True)
+
+    def _select(self):
+        # Payments add the card money received, liquidation lines take out
+        # what the acquirer settled. Ids are kept stable between refreshes.
+        return """
+            SELECT payment.id * 2 AS id,
+                   'payment' AS origin,
+                   move.company_id,
+                   move.date,
+                   payment.l10n_ec_recap_id AS recap_id,
+                   payment.l10n_ec_authorizer_id AS authorizer_id,
+                   payment.l10n_ec_issuer_id AS issuer_id,
+                   move.journal_id,
+                   payment.amount AS amount,
+                   COALESCE(recap.date, move.date) AS recap_date
+              FROM account_payment payment
+              JOIN account_move move ON move.id = payment.move_id
+         LEFT JOIN account_payment_recap recap ON recap.id = payment.l10n_ec_recap_id
+             WHERE payment.is_payment_tc
+               AND move.state = 'posted'
+         UNION ALL
+            SELECT line.id * 2 + 1 AS id,
+                   'liquidation' AS origin,
+                   liquidation.company_id,
+                   liquidation.date_account AS date,
+                   line.recap_id,
+                   recap.authorizer_id,
+                   line.issuer_id,
+                   recap.journal_id,
+                   -line.base AS amount,
+                   COALESCE(recap.date, liquidation.date_account) AS recap_date
+              FROM account_credit_card_liquidation_line line
+              JOIN account_credit_card_liquidation liquidation ON liquidation.id = line.liquidation_id
+         LEFT JOIN account_payment_recap recap ON recap.id = line.recap_id
+             WHERE liquidation.state = 'done'
+        """
+
+    def _query(self):
+        return """
+            SELECT data.*,
+                   CURRENT_DATE - data.recap_date AS age,
+                   %s AS age_bucket
+              FROM (%s) AS data
+        """ % (age_bucket_sql("data.recap_date"), self._select())
+
+    def init(self):
+        self.env.cr.execute("DROP MATERIALIZED VIEW IF EXISTS %s" % self._table)
+        self.env.cr.execute("CREATE MATERIALIZED VIEW %s AS (%s)" % (self._table, self._query()))
+        # The unique index is required to refresh the view concurrently
+        self.env.cr.execute(
+            "CREATE UNIQUE INDEX %s_id_index ON %s (id)" % (self._table, self._table)
+        )
+        self.env.cr.execute(
+            "CREATE INDEX %s_company_date_index ON %s (company_id, date)" % (self._table, self._table)
+        )
+        self.env.cr.execute(
+            "CREATE INDEX %s_recap_index ON %s (recap_id)" % (self._table, self._table)
+        )
+
+    @api.model
+    def _refresh_view(self):
+        """Recompute the analysis without locking the readers out of it."""
+        for model in ("account.payment", "account.move", "account.payment.recap",
+                      "account.credit.card.liquidation", "account.credit.card.liquidation.line"):
+            self.env[model].flush_model()
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY %s" % self._table)
+        self.invalidate_model()
+        _logger.info("Refreshed the credit card settlement analysis")
+        return True
@@ -0,0 +1,266 @@
+import csv
+import logging
+
+from odoo import api, fields, models, Command
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+from odoo.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+
+class AccountCreditCardVoucherRegister(models.TransientModel):
+    _name = "account.credit.card.voucher.register"
+    _inherit = "account.credit.card.file.mixin"
+    _description = "Register Credit Card Vouchers"
+
+    # Accepted CSV headers for each value of the vouchers
+    _CSV_COLUMNS = {
+        "invoice": ("invoice", "factura"),
+        "authorization": ("authorization", "autorizacion"),
+        "voucher": ("voucher", "voucher_number", "comprobante"),
+        "issuer": ("issuer", "emisor"),
+        "card_number": ("card_number", "last4", "tarjeta"),
+        "amount": ("amount", "monto", "valor"),
+    }
+
+    company_id = fields.Many2one(
+        comodel_name="res.company",
+        string="Company",
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    journal_id = fields.Many2one(
+        comodel_name="account.journal",
+        string="Card Journal",
+        required=True,
+        domain="[('is_payment_tc', '=', True), ('company_id', '=', company_id)]",
+    )
+    date = fields.Date(string="Payment Date", required=True, default=fields.Date.context_today)
+    authorizer_id = fields.Many2one(
+        comodel_name="account.credit.card.authorizer",
+        string="Authorizer",
+        required=True,
+    )
+    batch_number = fields.Char(string="# Batch/RECAP", required=True)
+    voucher_type = fields.Selection(
+        selection=[
+            ("automatic", "Automatic"),
+            ("manual", "Manual"),
+        ],
+        string="Voucher Type",
+        default="automatic",
+        required=True,
+    )
+    file = fields.Binary(string="Vouchers File")
+    filename = fields.Char(string="File Name")
+    line_ids = fields.One2many(
+        comodel_name="account.credit.card.voucher.register.line",
+        inverse_name="wizard_id",
+        string="Vouchers",
+    )
+
+    def action_load_file(self):
+        """Add a voucher row for every line of the CSV file.
+
+        Invoices and issuers are resolved with one query each.
+        """
+        self.ensure_one()
+        if not self.file:
+            raise UserError(_("You must select the file with the vouchers"))
+        rows = list(self._iter_csv_rows())
+        invoice_names = {row["invoice"] for row in rows if row.get("invoice")}
+        invoices = {
+            invoice["name"]: invoice["id"]
+            for invoice in self.env["account.move"].search_read(
+                [
+                    ("name", "in", list(invoice_names)),
+                    ("company_id", "=", self.company_id.id),
+                    ("move_type", "=", "out_invoice"),
+                    ("state", "=", "posted"),
+                ],
+                ["name"],
+            )
+        }
+        issuers = {
+            issuer["name"].lower(): issuer["id"]
+            for issuer in self.env["account.credit.card.issuer"].search_read([], ["name"])
+        }
+        missing = sorted(invoice_names - set(invoices))
+        if missing:
+            raise UserError(_("These invoices are not posted or don't exist: %s") % ", ".join(missing))
+        line_vals_list = []
+        for row_number, row in enumerate(rows, start=2):
+            try:
+                amount = self._parse_amount(row.get("amount"))
+            except ValueError:
+                raise UserError(_("Line %s of the file has an invalid amount") % row_number)
+            line_vals_list.append(Command.create({
+                "invoice_id": invoices.get(row.get("invoice")),
+                "authorization": row.get("authorization"),
+                "voucher_number": row.get("voucher"),
+                "issuer_id": issuers.get((row.get("issuer") or "").lower()),
+                "card_number": (row.get("card_number") or "")[-4:],
+                "amount": amount,
+            }))
+        self.write({"line_ids": line_vals_list, "file": False})
+        return self._reopen()
+
+    def _iter_csv_rows(self):
+        reader = csv.reader(self._open_file_stream())
+        positions = self._get_csv_positions(next(reader, []))
+        if "amount" not in positions or "authorization" not in positions:
+            raise UserError(_("The file must have at least the authorization and amount columns"))
+        for row in reader:
+            if not any(row):
+                continue
+            yield {
+                field: row[position].strip() if position < len(row) else ""
+                for field, position in positions.items()
+            }
+
+    def _reopen(self):
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_register(self):
+        """Create, post and reconcile the payments of every voucher at once.
+
+        The payments are created with a single call and posted together,
+        which resolves the RECAP of the batch once, then each invoice is
+        reconciled with the payments of its vouchers.
+        """
+        self.ensure_one()
+        if not self.line_ids:
+            raise UserError(_("You must enter at least one voucher"))
+        self._check_vouchers()
+        payments = self.env["account.payment"].create([
+            self._prepare_payment_vals(line) for line in self.line_ids
+        ])
+        payments.action_post()
+        self._reconcile_invoices(payments)
+        _logger.info("Registered %s credit card vouchers on batch %s", len(payments), self.batch_number)
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Card Payments"),
+            "res_model": "account.payment",
+            "view_mode": "tree,form",
+            "domain": [("id", "in", payments.ids)],
+        }
+
+    def _check_vouchers(self):
+        msg = []
+        amounts_by_invoice = {}
+        for line in self.line_ids:
+            if not line.partner_id:
+                msg.append(_("The voucher %s has no customer") % (line.authorization or ""))
+            if float_compare(line.amount, 0.0, precision_digits=2) <= 0:
+                msg.append(_("The voucher %s has no amount") % (line.authorization or ""))
+            if line.invoice_id:
+                amounts_by_invoice.setdefault(line.invoice_id, 0.0)
+                amounts_by_invoice[line.invoice_id] += line.amount
+        for invoice, amount in amounts_by_invoice.items():
+            if float_compare(amount, invoice.amount_residual, precision_digits=2) > 0:
+                msg.append(_("The vouchers of the invoice %s exceed its residual amount %s")
+                           % (invoice.name, invoice.amount_residual))
+        keys = [
+            (self.authorizer_id.id, line.authorization, line.voucher_number or False, self.journal_id.id)
+            for line in self.line_ids
+        ]
+        registered = self.env["account.payment"]._find_l10n_ec_duplicate_authorizations(keys)
+        seen = set()
+        for key in keys:
+            if key in registered:
+                msg.append(_("The authorization %s is already registered") % key[1])
+            elif key in seen:
+                msg.append(_("The authorization %s is repeated") % key[1])
+            seen.add(key)
+        if msg:
+            raise UserError("\n".join(msg))
+
+    def _prepare_payment_vals(self, line):
+        return {
+            "payment_type": "inbound",
+            "partner_type": "customer",
+            "partner_id": line.partner_id.id,
+            "amount": line.amount,
+            "date": self.date,
+            "journal_id": self.journal_id.id,
+            "ref": line.invoice_id.name or line.authorization,
+            "l10n_ec_authorizer_id": self.authorizer_id.id,
+            "l10n_ec_authorization_cc": line.authorization,
+            "l10n_ec_issuer_id": line.issuer_id.id,
+            "l10n_ec_voucher_type": self.voucher_type,
+            "l10n_ec_voucher_number": line.voucher_number,
+            "l10n_ec_voucher_batch_number": self.batch_number,
+            "l10n_ec_credit_card_number": line.card_number,
+        }
+
+    def _reconcile_invoices(self, payments):
+        invoices = self.line_ids.invoice_id
+        if not invoices:
+            return
+        # Receivable items of the invoices and the payments, read at once
+        lines = self.env["account.move.line"].search_read(
+            [
+                "|",
+                ("move_id", "in", invoices.ids),
+                ("payment_id", "in", payments.ids),
+                ("account_type", "=", "asset_receivable"),
+                ("reconciled", "=", False),
+            ],
+            ["move_id", "payment_id"],
+        )
+        invoice_by_payment = {
+            payment.id: line.invoice_id.id for payment, line in zip(payments, self.line_ids)
+        }
+        aml_ids_by_invoice = {}
+        for line in lines:
+            if line["payment_id"]:
+                invoice_id = invoice_by_payment.get(line["payment_id"][0])
+            else:
+                invoice_id = line["move_id"][0]
+            if invoice_id:
+                aml_ids_by_invoice.setdefault(invoice_id, []).append(line["id"])
+        self.env["account.credit.card.liquidation"]._reconcile_move_lines(
+            list(aml_ids_by_invoice.items())
+        )
+
+
+class AccountCreditCardVoucherRegisterLine(models.TransientModel):
+    _name = "account.credit.card.voucher.register.line"
+    _description = "Credit Card Voucher to Register"
+
+    wizard_id = fields.Many2one(
+        comodel_name="account.credit.card.voucher.register",
+        required=True,
+        ondelete="cascade",
+    )
+    invoice_id = fields.Many2one(
+        comodel_name="account.move",
+        string="Invoice",
+        domain=[("move_type", "=", "out_invoice"), ("state", "=", "posted"), ("payment_state", "!=", "paid")],
+    )
+    partner_id = fields.Many2one(
+        comodel_name="res.partner",
+        string="Customer",
+        compute="_compute_partner_id",
+        store=True,
+        readonly=False,
+    )
+    authorization = fields.Char(string="Authorization", required=True)
+    voucher_number = fields.Char(string="Voucher Number")
+    issuer_id = fields.Many2one(comodel_name="account.credit.card.issuer", string="Credit Card Issuer")
+    card_number = fields.Char(string="Last Credit Card Numbers", size=4)
+    amount = fields.Float(string="Amount", digits="Account", required=True)
+
+    @api.depends("invoice_id")
+    def _compute_partner_id(self):
+        for line in self:
+            if line.invoice_id:
+                line.partner_id = line.invoice_id.commercial_partner_id
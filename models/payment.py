@@ -1,22 +1,28 @@
 import logging
 
+import psycopg2.errors
+
 from odoo import api, fields, models
-from odoo.exceptions import UserError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import create_index, escape_psql
 from odoo.tools.translate import _
 
+from .credit_card_settlement_report import age_bucket_sql
+
 _logger = logging.getLogger(__name__)
 
 
 class AccountJournal(models.Model):
     _inherit = 'account.journal'
 
+    name = fields.Char(index="trigram")
     is_payment_tc = fields.Boolean('Es diario TC?')
 
 
 class AccountCreditCardAuthorizer(models.Model):
     _name = "account.credit.card.authorizer"
 
-    name = fields.Char("Short Name", required=True, readonly=False)
+    name = fields.Char("Short Name", required=True, readonly=False, index="trigram")
     partner_id = fields.Many2one("res.partner", "Partner Authorizer", required=True)
 
 
@@ -30,6 +36,7 @@ class CreditCardIssuer(models.Model):
 
 class AccountPaymentRecap(models.Model):
     _name = "account.payment.recap"
+    _inherit = ["mail.thread", "mail.activity.mixin"]
     _description = "RECAP/LOTE"
 
     company_id = fields.Many2one(
@@ -38,7 +45,7 @@ class AccountPaymentRecap(models.Model):
         default=lambda self: self.env.company,
         required=False,
     )
-    name = fields.Char("Number", required=False, readonly=True)
+    name = fields.Char("Number", required=False, readonly=True, index="trigram")
     date = fields.Date("Date", readonly=True)
     payment_line_ids = fields.One2many(
         "account.payment",
@@ -63,6 +70,7 @@ class AccountPaymentRecap(models.Model):
         "State",
         readonly=True,
         default="draft",
+        index=True,
     )
     authorizer_id = fields.Many2one(
         "account.credit.card.authorizer", "Authorizer", required=False, readonly=True
@@ -79,7 +87,7 @@ class AccountPaymentRecap(models.Model):
     #     related="printer_id.agency_id",
     #     store=True,
     # )
-    journal_id = fields.Many2one("account.journal", "Diario", readonly=True, ondelete="restrict")
+    journal_id = fields.Many2one("account.journal", "Diario", readonly=True, ondelete="restrict", index=True)
     amount_total = fields.Float(
         string="Total Amount",
         compute="_compute_amounts",
@@ -101,20 +109,48 @@ class AccountPaymentRecap(models.Model):
         "liquidation_line_ids.base",
     )
     def _compute_amounts(self):
-        for rec in self:
-            amount_total = 0.0
-            amount_not_reconciled = 0.0
-            for payment in rec.payment_line_ids.filtered(
-                    lambda x: x.state not in ("draft", "cancel")
-            ):
-                amount_total += payment.amount
-                amount_not_reconciled += payment.amount
-            for line in rec.liquidation_line_ids.filtered(
-                    lambda x: x.liquidation_id.state == "done"
-            ):
-                amount_not_reconciled -= line.base
-            rec.amount_total = amount_total
-            rec.amount_not_reconciled = amount_not_reconciled
+        with self.env["account.credit.card.liquidation.stats"]._profile("recap.compute_amounts", self):
+            amounts = self._read_recap_amounts()
+            for rec in self:
+                amount_total, amount_reconciled = amounts.get(rec.id, (0.0, 0.0))
+                rec.amount_total = amount_total
+                rec.amount_not_reconciled = amount_total - amount_reconciled
+
+    def _read_recap_amounts(self):
+        """Aggregate the payments and the liquidated amounts of the recaps.
+
+        Two grouped queries are run for the whole recordset instead of
+        loading every payment and liquidation line of each recap.
+
+        :return: dict mapping recap ids to (total paid, total liquidated)
+        """
+        recap_ids = [recap_id for recap_id in self.ids if isinstance(recap_id, int)]
+        if not recap_ids:
+            return {}
+        amounts = dict.fromkeys(recap_ids, (0.0, 0.0))
+        payment_groups = self.env["account.payment"]._read_group(
+            [
+                ("l10n_ec_recap_id", "in", recap_ids),
+                ("state", "not in", ("draft", "cancel")),
+            ],
+            ["amount:sum"],
+            ["l10n_ec_recap_id"],
+        )
+        for group in payment_groups:
+            recap_id = group["l10n_ec_recap_id"][0]
+            amounts[recap_id] = (group["amount"] or 0.0, amounts[recap_id][1])
+        line_groups = self.env["account.credit.card.liquidation.line"]._read_group(
+            [
+                ("recap_id", "in", recap_ids),
+                ("liquidation_id.state", "=", "done"),
+            ],
+            ["base:sum"],
+            ["recap_id"],
+        )
+        for group in line_groups:
+            recap_id = group["recap_id"][0]
+            amounts[recap_id] = (amounts[recap_id][0], group["base"] or 0.0)
+        return amounts
 
     _sql_constraints = [
         (
@@ -127,20 +163,150 @@ class AccountPaymentRecap(models.Model):
         ),
     ]
 
+    def init(self):
+        super().init()
+        # Lookup of the recap of a batch when posting card payments
+        create_index(
+            self._cr,
+            "account_payment_recap_name_journal_state_index",
+            self._table,
+            ["name", "journal_id", "state"],
+        )
+        # Recaps still open to liquidate, used by the RECAP domain of the liquidation lines
+        create_index(
+            self._cr,
+            "account_payment_recap_open_index",
+            self._table,
+            ["authorizer_id", "journal_id", "date"],
+            where="amount_not_reconciled > 0",
+        )
+        # Aging scan of the open recaps
+        create_index(
+            self._cr,
+            "account_payment_recap_state_date_index",
+            self._table,
+            ["state", "date"],
+        )
+
     @api.model
-    def name_search(self, name, args=None, operator="ilike", limit=100):
-        recs = self.browse()
-        if name:
-            recs = self.search([("name", "ilike", name)] + args, limit=limit)
-        if not recs:
-            recs = self.search([("journal_id", "ilike", name)] + args, limit=limit)
-        if not recs:
-            recs = self.search([("authorizer_id", "ilike", name)] + args, limit=limit)
-        if not recs:
-            return super(AccountPaymentRecap, self).name_search(
-                name, args, operator, limit
-            )
-        return recs.name_get()
+    def _get_stale_recap_days(self):
+        return int(self.env["ir.config_parameter"].sudo().get_param(
+            "l10n_ec_liquitadion_credit_card.stale_recap_days", 30
+        ))
+
+    @api.model
+    def _cron_scan_stale_recaps(self):
+        """Bucket the open balances by age and authorizer and flag stale recaps.
+
+        One aggregate query over the (state, date) index returns every
+        bucket along with the ids of the recaps past the threshold, which
+        get an activity unless they already have one.
+
+        :return: list of (authorizer id, age bucket, recaps, open balance)
+        """
+        threshold = self._get_stale_recap_days()
+        self.flush_model(["state", "date", "amount_not_reconciled", "authorizer_id"])
+        self.env.cr.execute(
+            """
+            SELECT authorizer_id,
+                   %s AS age_bucket,
+                   COUNT(*),
+                   SUM(amount_not_reconciled),
+                   ARRAY_AGG(id) FILTER (WHERE date < CURRENT_DATE - %%s)
+              FROM account_payment_recap
+             WHERE state = 'draft'
+               AND date IS NOT NULL
+               AND amount_not_reconciled > 0
+          GROUP BY authorizer_id, age_bucket
+          ORDER BY authorizer_id, age_bucket
+            """ % age_bucket_sql("date"),
+            (threshold,),
+        )
+        buckets = []
+        stale_ids = []
+        for authorizer_id, age_bucket, count, balance, bucket_stale_ids in self.env.cr.fetchall():
+            buckets.append((authorizer_id, age_bucket, count, float(balance or 0.0)))
+            stale_ids += bucket_stale_ids or []
+            _logger.info("Open RECAPs of authorizer %s aged %s: %s, balance %.2f",
+                         authorizer_id, age_bucket, count, balance or 0.0)
+        self.browse(stale_ids)._flag_stale_recaps(threshold)
+        return buckets
+
+    def _flag_stale_recaps(self, threshold):
+        activity_type = self.env.ref(
+            "l10n_ec_liquitadion_credit_card.mail_activity_stale_recap", raise_if_not_found=False
+        )
+        if not self or not activity_type:
+            return
+        activity_model = self.env["mail.activity"]
+        flagged_ids = set(activity_model.search([
+            ("res_model", "=", self._name),
+            ("res_id", "in", self.ids),
+            ("activity_type_id", "=", activity_type.id),
+        ]).mapped("res_id"))
+        to_flag = self.filtered(lambda x: x.id not in flagged_ids)
+        if not to_flag:
+            return
+        model_id = self.env["ir.model"]._get_id(self._name)
+        today = fields.Date.context_today(self)
+        activity_model.with_context(mail_activity_quick_update=True).create([
+            {
+                "res_model_id": model_id,
+                "res_id": recap.id,
+                "activity_type_id": activity_type.id,
+                "summary": _("RECAP open for more than %s days") % threshold,
+                "user_id": (recap.create_uid.active and recap.create_uid.id) or self.env.uid,
+                "date_deadline": today,
+            }
+            for recap in to_flag
+        ])
+        _logger.info("Flagged %s stale RECAPs", len(to_flag))
+
+    @api.model
+    def _name_search(self, name, args=None, operator="ilike", limit=100, name_get_uid=None):
+        """Search recaps by number, journal or authorizer with a single query.
+
+        Each name is matched through its trigram index and the recaps whose
+        number starts with the searched text are listed first.
+        """
+        if not name or operator != "ilike":
+            return super()._name_search(name, args, operator, limit=limit, name_get_uid=name_get_uid)
+        # Same checks as _search: access rights of name_get_uid, record rules of the current user
+        self.with_user(name_get_uid or self.env.uid).check_access_rights("read")
+        args = list(args or [])
+        self._flush_search(args, fields=["name", "journal_id", "authorizer_id"])
+        query = self._where_calc(args)
+        self._apply_ir_rules(query, "read")
+        from_clause, where_clause, where_params = query.get_sql()
+        pattern = "%%%s%%" % escape_psql(name)
+        self.env.cr.execute(
+            f"""
+            SELECT "account_payment_recap".id
+              FROM {from_clause}
+             WHERE {where_clause or "TRUE"}
+               AND "account_payment_recap".id IN (
+                    SELECT recap.id
+                      FROM account_payment_recap recap
+                     WHERE recap.name ILIKE %s
+                     UNION
+                    SELECT recap.id
+                      FROM account_payment_recap recap
+                      JOIN account_journal journal ON journal.id = recap.journal_id
+                     WHERE journal.name ILIKE %s
+                     UNION
+                    SELECT recap.id
+                      FROM account_payment_recap recap
+                      JOIN account_credit_card_authorizer authorizer ON authorizer.id = recap.authorizer_id
+                     WHERE authorizer.name ILIKE %s
+               )
+          ORDER BY "account_payment_recap".name ILIKE %s DESC,
+                   "account_payment_recap".name,
+                   "account_payment_recap".id
+             LIMIT %s
+            """,
+            [*where_params, pattern, pattern, pattern, "%s%%" % escape_psql(name), limit],
+        )
+        return [row[0] for row in self.env.cr.fetchall()]
 
     def name_get(self):
         res = []
@@ -220,6 +386,23 @@ class AccountPaymentRegister(models.TransientModel):
         size=4,
         required=False
     )
+    l10n_ec_duplicate_warning = fields.Char(
+        "Duplicate Authorization", compute="_compute_l10n_ec_duplicate_warning"
+    )
+
+    @api.depends("journal_id", "l10n_ec_authorizer_id", "l10n_ec_authorization_cc", "l10n_ec_voucher_number")
+    def _compute_l10n_ec_duplicate_warning(self):
+        payment_model = self.env["account.payment"]
+        for wizard in self:
+            duplicates = payment_model._find_l10n_ec_duplicate_authorizations([(
+                wizard.l10n_ec_authorizer_id.id,
+                wizard.l10n_ec_authorization_cc,
+                wizard.l10n_ec_voucher_number,
+                wizard.journal_id.id,
+            )])
+            wizard.l10n_ec_duplicate_warning = _(
+                "This authorization is already registered on %s payments"
+            ) % len(next(iter(duplicates.values()))) if duplicates else False
 
     def _create_payment_vals_from_wizard(self, batch_result):
         # OVERRIDE
@@ -239,10 +422,10 @@ class AccountPaymentRegister(models.TransientModel):
 class AccountPayment(models.Model):
     _inherit = "account.payment"
 
-    is_payment_tc = fields.Boolean(related='journal_id.is_payment_tc', store=True)
+    is_payment_tc = fields.Boolean(related='journal_id.is_payment_tc', store=True, index=True)
 
     l10n_ec_recap_id = fields.Many2one(
-        "account.payment.recap", "Batch / RECAP", readonly=True, ondelete="restrict"
+        "account.payment.recap", "Batch / RECAP", readonly=True, ondelete="restrict", index="btree_not_null"
     )
     l10n_ec_authorization_cc = fields.Char(
         "Credit Card Authorization Number", readonly=True, states=_PAYMENT_STATES
@@ -280,7 +463,7 @@ class AccountPayment(models.Model):
         "Voucher Number", required=False, readonly=True, states=_PAYMENT_STATES
     )
     l10n_ec_voucher_batch_number = fields.Char(
-        "# Batch/RECAP", required=False, readonly=True, states=_PAYMENT_STATES
+        "# Batch/RECAP", required=False, readonly=True, states=_PAYMENT_STATES, index="btree_not_null"
     )
     l10n_ec_credit_card_number = fields.Char(
         "Last Credit Card Numbers",
@@ -290,44 +473,243 @@ class AccountPayment(models.Model):
         states=_PAYMENT_STATES,
     )
 
+    def init(self):
+        super().init()
+        # Duplicate authorization lookup, the journal of the payments is
+        # stored on their journal entry and checked after this index
+        self._cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS account_payment_l10n_ec_authorization_index
+                ON account_payment (l10n_ec_authorizer_id, l10n_ec_authorization_cc, l10n_ec_voucher_number)
+             WHERE l10n_ec_authorization_cc IS NOT NULL
+            """
+        )
+
+    @api.model
+    def _find_l10n_ec_duplicate_authorizations(self, keys):
+        """Payments registered with the given card authorizations.
+
+        All the keys are looked up with a single query through the
+        authorization index, cancelled payments are ignored.
+
+        :param keys: list of (authorizer id, authorization, voucher number, journal id)
+        :return: dict mapping the keys already registered to their payment ids
+        """
+        keys = [key for key in keys if key[0] and key[1] and key[3]]
+        if not keys:
+            return {}
+        self.flush_model(["l10n_ec_authorizer_id", "l10n_ec_authorization_cc", "l10n_ec_voucher_number", "is_payment_tc"])
+        self.env["account.move"].flush_model(["journal_id", "state"])
+        authorizer_ids, authorizations, voucher_numbers, journal_ids = zip(*keys)
+        self.env.cr.execute(
+            """
+            SELECT key.authorizer_id, key.authorization_cc, key.voucher_number, key.journal_id,
+                   ARRAY_AGG(payment.id ORDER BY payment.id)
+              FROM unnest(%s::int[], %s::varchar[], %s::varchar[], %s::int[])
+                   AS key(authorizer_id, authorization_cc, voucher_number, journal_id)
+              JOIN account_payment payment
+                ON payment.l10n_ec_authorizer_id = key.authorizer_id
+               AND payment.l10n_ec_authorization_cc = key.authorization_cc
+               AND (payment.l10n_ec_voucher_number = key.voucher_number
+                    OR (payment.l10n_ec_voucher_number IS NULL AND key.voucher_number IS NULL))
+              JOIN account_move move ON move.id = payment.move_id
+             WHERE move.journal_id = key.journal_id
+               AND move.state != 'cancel'
+               AND payment.is_payment_tc
+          GROUP BY key.authorizer_id, key.authorization_cc, key.voucher_number, key.journal_id
+            """,
+            [list(authorizer_ids), list(authorizations), [number or None for number in voucher_numbers],
+             list(journal_ids)],
+        )
+        return {
+            (authorizer_id, authorization, voucher_number or False, journal_id): payment_ids
+            for authorizer_id, authorization, voucher_number, journal_id, payment_ids in self.env.cr.fetchall()
+        }
+
+    def _get_l10n_ec_authorization_key(self):
+        self.ensure_one()
+        return (
+            self.l10n_ec_authorizer_id.id,
+            self.l10n_ec_authorization_cc,
+            self.l10n_ec_voucher_number or False,
+            self.journal_id.id,
+        )
+
+    @api.constrains("journal_id", "l10n_ec_authorizer_id", "l10n_ec_authorization_cc", "l10n_ec_voucher_number")
+    def _check_l10n_ec_duplicate_authorization(self):
+        payments = self.filtered(lambda x: x.is_payment_tc and x.l10n_ec_authorization_cc)
+        duplicates = self._find_l10n_ec_duplicate_authorizations(
+            [payment._get_l10n_ec_authorization_key() for payment in payments]
+        )
+        msg = [
+            payment.l10n_ec_authorization_cc
+            for payment in payments
+            if set(duplicates.get(payment._get_l10n_ec_authorization_key(), [])) - {payment.id}
+        ]
+        if msg:
+            raise ValidationError(
+                _("The card authorizations %s are already registered with the same authorizer, "
+                  "voucher number and journal") % ", ".join(sorted(set(msg)))
+            )
+
+    @api.model
+    def _action_scan_l10n_ec_duplicate_authorizations(self):
+        """List the card payments sharing an authorization, found with one query."""
+        self.flush_model(["l10n_ec_authorizer_id", "l10n_ec_authorization_cc", "l10n_ec_voucher_number", "is_payment_tc"])
+        self.env["account.move"].flush_model(["journal_id", "state", "company_id"])
+        self.env.cr.execute(
+            """
+            SELECT ARRAY_AGG(payment.id)
+              FROM account_payment payment
+              JOIN account_move move ON move.id = payment.move_id
+             WHERE payment.l10n_ec_authorization_cc IS NOT NULL
+               AND payment.is_payment_tc
+               AND move.state != 'cancel'
+               AND move.company_id = ANY(%s)
+          GROUP BY payment.l10n_ec_authorizer_id, payment.l10n_ec_authorization_cc,
+                   payment.l10n_ec_voucher_number, move.journal_id
+            HAVING COUNT(*) > 1
+            """,
+            [self.env.companies.ids],
+        )
+        payment_ids = [payment_id for row in self.env.cr.fetchall() for payment_id in row[0]]
+        return {
+            "type": "ir.actions.act_window",
+            "name": _("Duplicate Card Authorizations"),
+            "res_model": "account.payment",
+            "view_mode": "tree,form",
+            "domain": [("id", "in", payment_ids)],
+            "context": {"group_by": ["l10n_ec_authorization_cc"], "create": False},
+        }
+
+    @api.model
+    def _get_trigger_fields_to_synchronize(self):
+        return super()._get_trigger_fields_to_synchronize() + ("l10n_ec_voucher_batch_number",)
+
+    def _prepare_move_line_default_vals(self, write_off_line_vals=None):
+        # The RECAP is part of the labels from the moment the journal items are created
+        line_vals_list = super()._prepare_move_line_default_vals(write_off_line_vals)
+        suffix = self._get_l10n_ec_recap_label_suffix()
+        if suffix:
+            for line_vals in line_vals_list:
+                line_vals["name"] = (line_vals.get("name") or "") + suffix
+        return line_vals_list
+
+    def _get_l10n_ec_recap_label_suffix(self):
+        self.ensure_one()
+        if not self.is_payment_tc or not self.l10n_ec_voucher_batch_number:
+            return ""
+        return " Recap " + self.l10n_ec_voucher_batch_number
+
     def action_post(self):
-        self.action_create_recap()
-        res = super(AccountPayment, self).action_post()
-        for payment in self:
-            if payment.is_payment_tc and payment.move_id:
-                for line in payment.move_id.line_ids:
-                    line.write(
-                        {
-                            "name": line.name
-                                    + " Recap "
-                                    + payment.l10n_ec_voucher_batch_number
-                        }
-                    )
+        with self.env["account.credit.card.liquidation.stats"]._profile("payment.action_post", self):
+            self.action_create_recap()
+            res = super(AccountPayment, self).action_post()
+            self._apply_l10n_ec_recap_labels()
         return res
 
+    def _apply_l10n_ec_recap_labels(self):
+        """Add the RECAP to the labels of journal items created without it.
+
+        Only needed for payments whose journal items predate the batch
+        number, the lines are written once per distinct label.
+        """
+        lines_by_name = {}
+        for payment in self:
+            suffix = payment._get_l10n_ec_recap_label_suffix()
+            if not suffix:
+                continue
+            for line in payment.move_id.line_ids:
+                if not (line.name or "").endswith(suffix):
+                    name = (line.name or "") + suffix
+                    lines_by_name.setdefault(name, self.env["account.move.line"])
+                    lines_by_name[name] |= line
+        for name, lines in lines_by_name.items():
+            lines.write({"name": name})
+
     def action_create_recap(self):
+        with self.env["account.credit.card.liquidation.stats"]._profile("payment.action_create_recap", self):
+            return self._create_recaps()
+
+    def _create_recaps(self):
         recap_model = self.env["account.payment.recap"].sudo()
-        for payment in self:
-            if payment.is_payment_tc:
-                batch = payment.l10n_ec_voucher_batch_number
-                recap = recap_model.search(
-                    [
-                        ("name", "=", batch),
-                        ("journal_id", "=", payment.journal_id.id),
-                        ("state", "!=", "cancel"),
-                    ],
-                    limit=1,
-                )
-                if recap:
-                    if recap.state == "done":
-                        recap.write({"state": "draft"})
-                else:
-                    recap = recap_model.create(
-                        payment._prepare_l10n_ec_recap_values(batch)
-                    )
-                payment.write({"l10n_ec_recap_id": recap.id})
+        payments_by_key = {}
+        for payment in self.filtered("is_payment_tc"):
+            key = (payment.l10n_ec_voucher_batch_number, payment.journal_id.id)
+            payments_by_key.setdefault(key, self.browse())
+            payments_by_key[key] |= payment
+        if not payments_by_key:
+            return True
+        recaps = recap_model.search(
+            [
+                ("name", "in", list({name for name, dummy in payments_by_key})),
+                ("journal_id", "in", list({journal_id for dummy, journal_id in payments_by_key})),
+                ("state", "!=", "cancel"),
+            ],
+            order="id",
+        )
+        # The search also matches names of one journal with the other
+        # journals, only the recaps of the posted batches are kept
+        recap_by_key = {}
+        for recap in recaps:
+            key = (recap.name, recap.journal_id.id)
+            if key in payments_by_key:
+                recap_by_key.setdefault(key, recap)
+        recaps_done = recap_model.union(*recap_by_key.values()).filtered(lambda x: x.state == "done")
+        missing_keys = [key for key in payments_by_key if key not in recap_by_key]
+        if missing_keys:
+            self._check_l10n_ec_cancelled_recaps(missing_keys)
+            recap_by_key.update(zip(missing_keys, self._create_l10n_ec_recaps(
+                [payments_by_key[key][0]._prepare_l10n_ec_recap_values(key[0]) for key in missing_keys]
+            )))
+        if recaps_done:
+            recaps_done.write({"state": "draft"})
+        for key, payments in payments_by_key.items():
+            payments.write({"l10n_ec_recap_id": recap_by_key[key].id})
         return True
 
+    @api.model
+    def _check_l10n_ec_cancelled_recaps(self, keys):
+        """Refuse the batch numbers of cancelled recaps.
+
+        Their number stays taken on the journal, a new recap can't reuse it.
+        """
+        cancelled = self.env["account.payment.recap"].sudo().search([
+            ("name", "in", list({name for name, dummy in keys})),
+            ("journal_id", "in", list({journal_id for dummy, journal_id in keys})),
+            ("state", "=", "cancel"),
+        ])
+        names = sorted({
+            "%s - %s" % (recap.name, recap.journal_id.name)
+            for recap in cancelled
+            if (recap.name, recap.journal_id.id) in keys
+        })
+        if names:
+            raise UserError(
+                _("The Batch/RECAP %s was cancelled, its number can't be used again on the same journal")
+                % ", ".join(names)
+            )
+
+    @api.model
+    def _create_l10n_ec_recaps(self, vals_list):
+        # Recaps are created along with the payments, they don't need a creation message
+        recap_model = self.env["account.payment.recap"].sudo().with_context(
+            mail_create_nolog=True, mail_create_nosubscribe=True
+        )
+        try:
+            with self.env.cr.savepoint():
+                return recap_model.create(vals_list)
+        except psycopg2.errors.UniqueViolation:
+            # Another posting created one of these batches after this
+            # transaction started, it can't be seen from here
+            raise UserError(
+                _(
+                    "The Batch/RECAP %s has just been registered by another user, "
+                    "please try again."
+                )
+                % ", ".join(vals["name"] or "" for vals in vals_list)
+            )
+
     def _prepare_l10n_ec_recap_values(self, batch):
         self.ensure_one()
         return {
@@ -346,4 +728,5 @@ class AccountMove(models.Model):
     liquidation_id = fields.Many2one(
         comodel_name="account.credit.card.liquidation",
         string="Liquidación de TC",
+        index="btree_not_null",
     )
@@ -6,3 +6,14 @@ class ResCompany(models.Model):
 
     tax_id_ret_liquidation = fields.Many2one('account.tax', string='Renta')
     tax_id_vat_liquidation = fields.Many2one('account.tax', string='IVA')
+    l10n_ec_liquidation_profiling = fields.Boolean(
+        string="Profile Credit Card Liquidations",
+        help="Record the queries and time spent confirming liquidations and posting card payments",
+    )
+
+    def write(self, vals):
+        res = super().write(vals)
+        if "tax_id_ret_liquidation" in vals or "tax_id_vat_liquidation" in vals:
+            # Default taxes of the liquidations are cached
+            self.clear_caches()
+        return res
@@ -12,3 +12,29 @@ class StockConfig(models.TransientModel):
     tax_id_vat_liquidation = fields.Many2one('account.tax', string='IVA',
                                              related="company_id.tax_id_vat_liquidation",
                                              readonly=False)
+    l10n_ec_liquidation_job_chunk_size = fields.Integer(
+        string="Liquidations per Chunk",
+        help="Liquidation jobs claimed and confirmed together by a worker",
+        config_parameter="l10n_ec_liquitadion_credit_card.job_chunk_size",
+        default=20,
+    )
+    l10n_ec_liquidation_job_concurrency = fields.Integer(
+        string="Concurrent Liquidation Chunks",
+        help="Chunks of liquidation jobs that can run at the same time",
+        config_parameter="l10n_ec_liquitadion_credit_card.job_concurrency",
+        default=2,
+    )
+    l10n_ec_liquidation_job_max_attempts = fields.Integer(
+        string="Liquidation Job Attempts",
+        config_parameter="l10n_ec_liquitadion_credit_card.job_max_attempts",
+        default=3,
+    )
+    l10n_ec_stale_recap_days = fields.Integer(
+        string="Stale RECAP after (days)",
+        config_parameter="l10n_ec_liquitadion_credit_card.stale_recap_days",
+        default=30,
+    )
+    l10n_ec_liquidation_profiling = fields.Boolean(
+        related="company_id.l10n_ec_liquidation_profiling",
+        readonly=False,
+    )
@@ -0,0 +1 @@
+from . import credit_card_liquidation_report
@@ -0,0 +1,118 @@
+from odoo import api, models
+
+# Line values printed on the liquidation report, in column order
+_REPORT_AMOUNT_FIELDS = (
+    "base",
+    "commission",
+    "commission_iva",
+    "rent_base",
+    "rent_withhold",
+    "iva_withhold",
+    "net_value",
+)
+_MOVE_AMOUNT_FIELDS = ("debit", "credit")
+
+
+class CreditCardReportPaginationMixin(models.AbstractModel):
+    _name = "account.credit.card.report.mixin"
+    _description = "Credit Card Report Pagination"
+
+    _default_page_size = 40
+
+    @api.model
+    def _get_page_size(self):
+        value = self.env["ir.config_parameter"].sudo().get_param(
+            "l10n_ec_liquitadion_credit_card.report_page_size"
+        )
+        return max(int(value or self._default_page_size), 1)
+
+    @api.model
+    def _paginate(self, rows, amount_fields):
+        """Split ``rows`` in pages of a fixed size.
+
+        Every page carries the totals of the previous pages so each one can
+        print what it brings forward and its running subtotal.
+        """
+        page_size = self._get_page_size()
+        totals = dict.fromkeys(amount_fields, 0.0)
+        pages = []
+        for start in range(0, len(rows), page_size):
+            page_rows = rows[start:start + page_size]
+            carried = dict(totals)
+            for row in page_rows:
+                for field in amount_fields:
+                    totals[field] += row[field]
+            pages.append({
+                "rows": page_rows,
+                "carried": carried,
+                "subtotal": dict(totals),
+                "first": not start,
+                "last": start + page_size >= len(rows),
+            })
+        return pages or [{
+            "rows": [], "carried": dict(totals), "subtotal": dict(totals), "first": True, "last": True,
+        }]
+
+
+class ReportCreditCardLiquidation(models.AbstractModel):
+    _name = "report.l10n_ec_liquitadion_credit_card.report_credit_card_liquidation"
+    _inherit = "account.credit.card.report.mixin"
+    _description = "Credit Card Liquidation Report"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env["account.credit.card.liquidation"].browse(docids)
+        lines = self.env["account.credit.card.liquidation.line"].search_read(
+            [("liquidation_id", "in", docs.ids)],
+            ["liquidation_id", "recap_id"] + list(_REPORT_AMOUNT_FIELDS),
+            order="liquidation_id, id",
+        )
+        lines_by_liquidation = {}
+        for line in lines:
+            line["recap"] = line["recap_id"] and line["recap_id"][1] or ""
+            lines_by_liquidation.setdefault(line["liquidation_id"][0], []).append(line)
+        return {
+            "doc_ids": docids,
+            "doc_model": "account.credit.card.liquidation",
+            "docs": docs,
+            "amount_fields": _REPORT_AMOUNT_FIELDS,
+            "pages": {
+                doc.id: self._paginate(lines_by_liquidation.get(doc.id, []), _REPORT_AMOUNT_FIELDS)
+                for doc in docs
+            },
+        }
+
+
+class ReportCreditCardMoveLines(models.AbstractModel):
+    _name = "report.l10n_ec_liquitadion_credit_card.report_credit_card_move_lines"
+    _inherit = "account.credit.card.report.mixin"
+    _description = "Credit Card Liquidation Journal Entry Report"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env["account.credit.card.liquidation"].browse(docids)
+        lines_by_move = {}
+        # Account names are printed in the language of each partner
+        for lang in set(docs.partner_id.mapped("lang")) or {False}:
+            lang_docs = docs.filtered(lambda x: x.partner_id.lang == lang)
+            moves = lang_docs.move_id | lang_docs.withhold_id
+            lines = self.env["account.move.line"].with_context(lang=lang or self.env.lang).search_read(
+                [("move_id", "in", moves.ids)],
+                ["move_id", "account_id", "name"] + list(_MOVE_AMOUNT_FIELDS),
+                order="move_id, id",
+            )
+            for line in lines:
+                line["account"] = line["account_id"] and line["account_id"][1] or ""
+                lines_by_move.setdefault(line["move_id"][0], []).append(line)
+        return {
+            "doc_ids": docids,
+            "doc_model": "account.credit.card.liquidation",
+            "docs": docs,
+            "pages": {
+                doc.id: self._paginate(
+                    lines_by_move.get(doc.move_id.id, []) + lines_by_move.get(doc.withhold_id.id, []),
+                    _MOVE_AMOUNT_FIELDS,
+                )
+                for doc in docs
+            },
+        }
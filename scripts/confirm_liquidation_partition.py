@@ -0,0 +1,22 @@
+"""Confirm one partition of credit card liquidations and print its report.
+
+Started by ``_run_partitioned_confirmation`` once per partition, every run is
+an independent ``odoo shell`` process with its own registry and cursor::
+
+    odoo shell -d <database> --no-http < scripts/confirm_liquidation_partition.py
+
+The liquidations come in ``L10N_EC_LIQUIDATION_IDS`` (comma separated ids),
+the user and context in ``L10N_EC_UID`` and ``L10N_EC_CONTEXT`` (JSON). The
+report is printed as JSON on the last line of the output.
+"""
+import json
+import os
+
+liquidation_ids = [int(liquidation_id) for liquidation_id in os.environ["L10N_EC_LIQUIDATION_IDS"].split(",")]
+worker_env = env(
+    user=int(os.environ.get("L10N_EC_UID") or env.uid),
+    context=json.loads(os.environ.get("L10N_EC_CONTEXT") or "{}"),
+)
+report = worker_env["account.credit.card.liquidation"].browse(liquidation_ids)._confirm_liquidations()
+env.cr.commit()
+print(json.dumps(report))
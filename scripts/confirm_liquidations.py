@@ -0,0 +1,40 @@
+"""Confirm the draft credit card liquidations with several worker processes.
+
+The liquidations are split in partitions that share no journal, RECAP,
+invoice or no-gap sequence, and every partition is confirmed by its own
+``odoo shell`` process (``scripts/confirm_liquidation_partition.py``). A
+single summary is printed at the end. Run it from an Odoo shell::
+
+    odoo shell -d <database> --no-http < scripts/confirm_liquidations.py
+
+The selection is set with environment variables: ``L10N_EC_DATE_FROM`` and
+``L10N_EC_DATE_TO`` (accounting dates), ``L10N_EC_COMPANY_IDS`` (comma
+separated ids) and ``L10N_EC_WORKERS`` (processes, the CPU count by default).
+"""
+import json
+import os
+
+domain = [("state", "=", "draft")]
+if os.environ.get("L10N_EC_DATE_FROM"):
+    domain.append(("date_account", ">=", os.environ["L10N_EC_DATE_FROM"]))
+if os.environ.get("L10N_EC_DATE_TO"):
+    domain.append(("date_account", "<=", os.environ["L10N_EC_DATE_TO"]))
+if os.environ.get("L10N_EC_COMPANY_IDS"):
+    company_ids = [int(company_id) for company_id in os.environ["L10N_EC_COMPANY_IDS"].split(",")]
+    domain.append(("company_id", "in", company_ids))
+    env = env(context=dict(env.context, allowed_company_ids=company_ids))
+
+liquidations = env["account.credit.card.liquidation"].search(domain, order="date_account, id")
+print("Confirming %s credit card liquidations" % len(liquidations))
+summary = liquidations._run_partitioned_confirmation(int(os.environ.get("L10N_EC_WORKERS") or 0) or None)
+env.cr.commit()
+print(json.dumps(
+    {
+        "partitions": summary["partitions"],
+        "workers": summary["workers"],
+        "duration": summary["duration"],
+        "done": len(summary["done"]),
+        "failed": summary["failed"],
+    },
+    indent=2,
+))
@@ -0,0 +1,148 @@
+"""Query plans of the credit card hot paths with and without the module indexes.
+
+Seeds recaps directly in the database, prints ``EXPLAIN ANALYZE`` of the
+queries run when posting card payments and filling liquidations, first
+without the indexes declared by the module and then with them. Everything
+is rolled back at the end.
+
+Dropping the indexes locks the tables until the rollback, so the script
+only runs on a neutralized copy of the database and refuses any other::
+
+    odoo neutralize -d <copy>
+    odoo shell -d <copy> --no-http < scripts/explain_indexes.py
+
+The number of seeded recaps can be changed with ``L10N_EC_BENCH_RECAPS``.
+"""
+import os
+
+INDEXES = [
+    "account_payment_recap_name_journal_state_index",
+    "account_payment_recap_open_index",
+    "account_payment_recap__state_index",
+    "account_payment_recap__journal_id_index",
+    "account_payment_recap__name_index",
+    "account_journal__name_index",
+    "account_credit_card_authorizer__name_index",
+    "account_payment__l10n_ec_recap_id_index",
+    "account_payment__l10n_ec_voucher_batch_number_index",
+    "account_payment__is_payment_tc_index",
+    "account_credit_card_liquidation_line__recap_id_index",
+    "account_credit_card_liquidation_line__liquidation_id_index",
+    "account_move__liquidation_id_index",
+]
+
+QUERIES = {
+    "recap lookup when posting": (
+        "SELECT id FROM account_payment_recap"
+        " WHERE name = %(name)s AND journal_id = %(journal_id)s AND state != 'cancel'"
+    ),
+    "open recaps of the liquidation lines": (
+        "SELECT id FROM account_payment_recap"
+        " WHERE amount_not_reconciled > 0 AND journal_id = %(journal_id)s ORDER BY id LIMIT 8"
+    ),
+    # Same query as AccountPaymentRecap._name_search, without record rules
+    "recap name search": (
+        "SELECT id FROM account_payment_recap"
+        " WHERE id IN ("
+        "   SELECT recap.id FROM account_payment_recap recap WHERE recap.name ILIKE %(pattern)s"
+        "   UNION"
+        "   SELECT recap.id FROM account_payment_recap recap"
+        "     JOIN account_journal journal ON journal.id = recap.journal_id"
+        "    WHERE journal.name ILIKE %(pattern)s"
+        "   UNION"
+        "   SELECT recap.id FROM account_payment_recap recap"
+        "     JOIN account_credit_card_authorizer authorizer ON authorizer.id = recap.authorizer_id"
+        "    WHERE authorizer.name ILIKE %(pattern)s"
+        " )"
+        " ORDER BY name ILIKE %(prefix)s DESC, name, id LIMIT 8"
+    ),
+    "payments of a recap": (
+        "SELECT id, amount FROM account_payment WHERE l10n_ec_recap_id = %(recap_id)s"
+    ),
+    "liquidation lines of a recap": (
+        "SELECT id, base FROM account_credit_card_liquidation_line WHERE recap_id = %(recap_id)s"
+    ),
+}
+
+
+def seed(env, count):
+    cr = env.cr
+    journals = env["account.journal"].search([("type", "in", ("bank", "cash"))], limit=5)
+    authorizers = env["account.credit.card.authorizer"].search([], limit=2)
+    if not authorizers:
+        authorizers = env["account.credit.card.authorizer"].create([
+            {"name": name, "partner_id": env.company.partner_id.id} for name in ("DATAFAST", "MEDIANET")
+        ])
+    env.flush_all()
+    cr.execute(
+        """
+        INSERT INTO account_payment_recap (company_id, name, date, state, journal_id, authorizer_id,
+                                           amount_total, amount_not_reconciled,
+                                           create_uid, create_date, write_uid, write_date)
+        SELECT %(company_id)s,
+               'BENCH' || lpad(serie::text, 8, '0'),
+               CURRENT_DATE - (serie %% 365),
+               CASE WHEN serie %% 10 = 0 THEN 'draft' ELSE 'done' END,
+               (%(journal_ids)s::int[])[1 + serie %% %(journal_count)s],
+               (%(authorizer_ids)s::int[])[1 + serie %% %(authorizer_count)s],
+               100.0,
+               CASE WHEN serie %% 10 = 0 THEN 100.0 ELSE 0.0 END,
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM generate_series(1, %(count)s) serie
+        """,
+        {
+            "company_id": env.company.id,
+            "journal_ids": journals.ids,
+            "journal_count": len(journals),
+            "authorizer_ids": authorizers.ids,
+            "authorizer_count": len(authorizers),
+            "uid": env.uid,
+            "count": count,
+        },
+    )
+    cr.execute("ANALYZE account_payment_recap")
+    cr.execute("SELECT id, name, journal_id FROM account_payment_recap WHERE name LIKE 'BENCH%%' ORDER BY id DESC LIMIT 1")
+    recap_id, name, journal_id = cr.fetchone()
+    return {
+        "recap_id": recap_id,
+        "name": name,
+        "journal_id": journal_id,
+        "pattern": "%%%s%%" % name[-5:],
+        "prefix": "%s%%" % name[-5:],
+    }
+
+
+def explain(env, params):
+    plans = {}
+    for label, query in QUERIES.items():
+        env.cr.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+        plans[label] = "\n".join(row[0] for row in env.cr.fetchall())
+    return plans
+
+
+def main(env, count):
+    cr = env.cr
+    if not env["ir.config_parameter"].sudo().get_param("database.is_neutralized"):
+        raise SystemExit(
+            "%s is not a neutralized copy, run the script on a copy made with odoo neutralize" % cr.dbname
+        )
+    try:
+        params = seed(env, count)
+        cr.execute("SAVEPOINT without_indexes")
+        for index in INDEXES:
+            cr.execute('DROP INDEX IF EXISTS "%s"' % index)
+        before = explain(env, params)
+        cr.execute("ROLLBACK TO SAVEPOINT without_indexes")
+        after = explain(env, params)
+    finally:
+        cr.rollback()
+    for label in QUERIES:
+        print("=" * 80)
+        print(label)
+        print("-" * 34, "without indexes", "-" * 29)
+        print(before[label])
+        print("-" * 34, "with indexes", "-" * 32)
+        print(after[label])
+
+
+main(env, int(os.environ.get("L10N_EC_BENCH_RECAPS", 200000)))  # noqa: F821
@@ -0,0 +1,4 @@
+from . import test_benchmark_liquidation
+from . import test_payment_recap
+from . import test_liquidation_match
+from . import test_liquidation_confirm
@@ -0,0 +1,237 @@
+"""Benchmarks of the credit card liquidation lifecycle.
+
+Run them explicitly, they are excluded from the regular test runs::
+
+    odoo -d <db> -i l10n_ec_liquitadion_credit_card --test-tags benchmark --stop-after-init
+
+The size of the data set is read from the ``L10N_EC_BENCHMARK_PAYMENTS`` and
+``L10N_EC_BENCHMARK_RECAPS`` environment variables. Every step records its
+query count, wall time and the number of records involved; the results are
+written as JSON to ``L10N_EC_BENCHMARK_OUTPUT`` (by default
+``l10n_ec_liquidation_benchmark.json`` in the temporary directory) so runs
+can be compared over time.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from odoo import Command, fields, release
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install", "-standard", "benchmark")
+class TestBenchmarkLiquidation(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref="l10n_ec.l10n_ec_ifrs"):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.payment_count = int(os.environ.get("L10N_EC_BENCHMARK_PAYMENTS", 500))
+        cls.recap_count = int(os.environ.get("L10N_EC_BENCHMARK_RECAPS", 20))
+        cls.results = {}
+
+        cls.acquirer = cls.env["res.partner"].create({"name": "Datafast"})
+        cls.authorizer = cls.env["account.credit.card.authorizer"].create({
+            "name": "DF",
+            "partner_id": cls.acquirer.id,
+        })
+        cls.issuer = cls.env["account.credit.card.issuer"].create({"name": "Visa"})
+        cls.card_journal = cls.env["account.journal"].create({
+            "name": "Credit Cards",
+            "code": "BTC",
+            "type": "bank",
+            "is_payment_tc": True,
+        })
+        cls.env["account.credit.card.rate"].create({
+            "authorizer_id": cls.authorizer.id,
+            "date_from": "2000-01-01",
+            "commission_rate": 4.5,
+            "iva_withhold_rate": 30.0,
+            "rent_withhold_rate": 2.0,
+        })
+        cls.withhold_account = cls.env["account.account"].search([
+            ("company_id", "=", cls.env.company.id),
+            ("account_type", "=", "liability_current"),
+        ], limit=1)
+        cls.commission_account = cls.company_data["default_account_expense"]
+
+        payments = cls.env["account.payment"].create([
+            {
+                "payment_type": "inbound",
+                "partner_type": "customer",
+                "partner_id": cls.partner_a.id,
+                "journal_id": cls.card_journal.id,
+                "amount": 100.0 + index % 7,
+                "l10n_ec_authorizer_id": cls.authorizer.id,
+                "l10n_ec_issuer_id": cls.issuer.id,
+                "l10n_ec_authorization_cc": "A%06d" % index,
+                "l10n_ec_voucher_number": "%06d" % index,
+                "l10n_ec_voucher_batch_number": "R%04d" % (index % cls.recap_count),
+                "l10n_ec_credit_card_number": "4242",
+            }
+            for index in range(cls.payment_count)
+        ])
+        with cls._benchmark("payment_action_post", len(payments)):
+            payments.action_post()
+        cls.recaps = payments.l10n_ec_recap_id
+        with cls._benchmark("payment_action_create_recap", len(payments)):
+            payments.action_create_recap()
+        cls.recaps.invalidate_recordset(["amount_total", "amount_not_reconciled"])
+        with cls._benchmark("recap_compute_amounts", len(cls.recaps)):
+            cls.recaps._compute_amounts()
+
+    @classmethod
+    def tearDownClass(cls):
+        output = os.environ.get("L10N_EC_BENCHMARK_OUTPUT") or os.path.join(
+            tempfile.gettempdir(), "l10n_ec_liquidation_benchmark.json"
+        )
+        report = {
+            "date": fields.Datetime.to_string(fields.Datetime.now()),
+            "odoo": release.version,
+            "payments": cls.payment_count,
+            "recaps": cls.recap_count,
+            "steps": cls.results,
+        }
+        with open(output, "w") as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+        _logger.info("Credit card liquidation benchmark written to %s: %s", output, json.dumps(cls.results))
+        super().tearDownClass()
+
+    @classmethod
+    @contextmanager
+    def _benchmark(cls, step, records):
+        cls.env.flush_all()
+        queries = cls.env.cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        cls.env.flush_all()
+        cls.results[step] = {
+            "queries": cls.env.cr.sql_log_count - queries,
+            "duration": round(time.perf_counter() - started, 4),
+            "records": records,
+        }
+
+    def _create_commission_entry(self, amount):
+        """Journal entry standing for the commission invoice of the acquirer."""
+        entry = self.env["account.move"].create({
+            "move_type": "entry",
+            "journal_id": self.company_data["default_journal_misc"].id,
+            "date": fields.Date.today(),
+            "line_ids": [
+                Command.create({
+                    "account_id": self.commission_account.id,
+                    "partner_id": self.acquirer.id,
+                    "debit": amount,
+                }),
+                Command.create({
+                    "account_id": self.acquirer.property_account_payable_id.id,
+                    "partner_id": self.acquirer.id,
+                    "credit": amount,
+                }),
+            ],
+        })
+        entry.action_post()
+        return entry
+
+    def _create_liquidation(self, **vals):
+        liquidation = self.env["account.credit.card.liquidation"].create({
+            "partner_id": self.acquirer.id,
+            "account_id": self.env.company.account_journal_payment_debit_account_id.id,
+            "journal_id": self.company_data["default_journal_bank"].id,
+            "date_account": fields.Date.today(),
+            "no_withhold": True,
+            "account_withhold_rent_id": self.withhold_account.id,
+            "account_withhold_iva_id": self.withhold_account.id,
+            "line_ids": [
+                Command.create({
+                    "recap_id": recap.id,
+                    "base": recap.amount_not_reconciled,
+                    "issuer_id": self.issuer.id,
+                    "card_type": "credit",
+                })
+                for recap in self.recaps
+            ],
+            **vals,
+        })
+        with self._benchmark("liquidation_compute_fees", len(liquidation.line_ids)):
+            liquidation.action_compute_fees()
+        return liquidation
+
+    def _get_withhold_values(self):
+        journal = self.env["account.journal"].search([
+            ("company_id", "=", self.env.company.id),
+            ("l10n_ec_withhold_type", "=", "out_withhold"),
+        ], limit=1)
+        tax_model = self.env["account.tax"]
+        tax_ret = tax_model.search([
+            ("company_id", "=", self.env.company.id),
+            ("tax_group_id.l10n_ec_type", "=", "withhold_income_sale"),
+        ], limit=1)
+        tax_vat = tax_model.search([
+            ("company_id", "=", self.env.company.id),
+            ("tax_group_id.l10n_ec_type", "=", "withhold_vat_sale"),
+        ], limit=1)
+        if not (journal and tax_ret and tax_vat):
+            self.skipTest("The chart of accounts has no sale withholds")
+        return {
+            "no_withhold": False,
+            "journal_ret_id": journal.id,
+            "tax_id_ret": tax_ret.id,
+            "tax_id_vat": tax_vat.id,
+            "document_number": "001-001-000000001",
+        }
+
+    def test_liquidation_done_single_invoice(self):
+        liquidation = self._create_liquidation()
+        liquidation.invoice_id = self._create_commission_entry(liquidation.commission + liquidation.commission_iva)
+        with self._benchmark("liquidation_action_done", len(liquidation.line_ids)):
+            liquidation.action_done()
+        self.assertEqual(liquidation.state, "done")
+
+    def test_liquidation_done_with_withhold(self):
+        liquidation = self._create_liquidation(**self._get_withhold_values())
+        liquidation.invoice_id = self._create_commission_entry(liquidation.commission + liquidation.commission_iva)
+        with self._benchmark("liquidation_action_done_withhold", len(liquidation.line_ids)):
+            liquidation.action_done()
+        self.assertEqual(liquidation.state, "done")
+        self.assertTrue(liquidation.withhold_id)
+
+    def test_liquidation_done_multi_invoice(self):
+        liquidation = self._create_liquidation()
+        total = liquidation.commission + liquidation.commission_iva
+        half = round(total / 2, 2)
+        liquidation.line_invoice_ids = [
+            Command.create({"invoice_id": self._create_commission_entry(half).id, "amount": half}),
+            Command.create({"invoice_id": self._create_commission_entry(total - half).id, "amount": round(total - half, 2)}),
+        ]
+        with self._benchmark("liquidation_action_done_multi_invoice", len(liquidation.line_ids)):
+            liquidation.action_done()
+        self.assertEqual(liquidation.state, "done")
+
+    def test_liquidation_cancel(self):
+        liquidation = self._create_liquidation()
+        liquidation.invoice_id = self._create_commission_entry(liquidation.commission + liquidation.commission_iva)
+        liquidation.action_done()
+        with self._benchmark("liquidation_action_cancel", len(liquidation.line_ids)):
+            liquidation.action_cancel()
+        self.assertEqual(liquidation.state, "cancel")
+
+    def test_liquidation_report(self):
+        liquidation = self._create_liquidation()
+        liquidation.invoice_id = self._create_commission_entry(liquidation.commission + liquidation.commission_iva)
+        liquidation.action_done()
+        report_model = self.env["ir.actions.report"]
+        with self._benchmark("report_liquidation", len(liquidation.line_ids)):
+            report_model._render_qweb_pdf(
+                "l10n_ec_liquitadion_credit_card.action_report_credit_card_liquidation_pdf", liquidation.ids
+            )
+        with self._benchmark("report_move_lines", len(liquidation.move_id.line_ids)):
+            report_model._render_qweb_pdf(
+                "l10n_ec_liquitadion_credit_card.action_report_credit_card_move_pdf", liquidation.ids
+            )
@@ -0,0 +1,175 @@
+from odoo import Command, fields
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged("post_install", "-at_install")
+class TestLiquidationConfirm(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.acquirer = cls.env["res.partner"].create({"name": "Datafast"})
+        cls.authorizer = cls.env["account.credit.card.authorizer"].create({
+            "name": "DF",
+            "partner_id": cls.acquirer.id,
+        })
+        cls.issuer = cls.env["account.credit.card.issuer"].create({"name": "Visa"})
+        cls.card_journal = cls.env["account.journal"].create({
+            "name": "Credit Cards",
+            "code": "BTC",
+            "type": "bank",
+            "is_payment_tc": True,
+        })
+        cls.commission_account = cls.company_data["default_account_expense"]
+        cls.withhold_account = cls.env["account.account"].search([
+            ("company_id", "=", cls.env.company.id),
+            ("account_type", "=", "liability_current"),
+        ], limit=1)
+        # Journal items of the liquidations can't be posted on this journal
+        cls.restricted_journal = cls.env["account.journal"].create({
+            "name": "Restricted Bank",
+            "code": "RBK",
+            "type": "bank",
+            "account_control_ids": [Command.set(cls.commission_account.ids)],
+        })
+        payments = cls.env["account.payment"].create([
+            {
+                "payment_type": "inbound",
+                "partner_type": "customer",
+                "partner_id": cls.partner_a.id,
+                "journal_id": cls.card_journal.id,
+                "amount": 100.0,
+                "l10n_ec_authorizer_id": cls.authorizer.id,
+                "l10n_ec_issuer_id": cls.issuer.id,
+                "l10n_ec_authorization_cc": "A%s" % index,
+                "l10n_ec_voucher_number": "V%s" % index,
+                "l10n_ec_voucher_batch_number": "R%s" % index,
+            }
+            for index in range(4)
+        ])
+        payments.action_post()
+        cls.recaps = payments.l10n_ec_recap_id.sorted("name")
+
+    def _create_commission_entry(self, amount):
+        """Journal entry standing for the commission invoice of the acquirer."""
+        entry = self.env["account.move"].create({
+            "move_type": "entry",
+            "journal_id": self.company_data["default_journal_misc"].id,
+            "date": fields.Date.today(),
+            "line_ids": [
+                Command.create({
+                    "account_id": self.commission_account.id,
+                    "partner_id": self.acquirer.id,
+                    "debit": amount,
+                }),
+                Command.create({
+                    "account_id": self.acquirer.property_account_payable_id.id,
+                    "partner_id": self.acquirer.id,
+                    "credit": amount,
+                }),
+            ],
+        })
+        entry.action_post()
+        return entry
+
+    def _get_payable_residual(self, entry):
+        return sum(entry.line_ids.filtered(
+            lambda x: x.account_id == self.acquirer.property_account_payable_id
+        ).mapped("amount_residual"))
+
+    def _create_liquidation(self, recaps, **vals):
+        """Liquidation of ``recaps`` with a commission of 4.48 and a withhold of 1.0 each."""
+        return self.env["account.credit.card.liquidation"].create({
+            "partner_id": self.acquirer.id,
+            "account_id": self.env.company.account_journal_payment_debit_account_id.id,
+            "journal_id": self.company_data["default_journal_bank"].id,
+            "date_account": fields.Date.today(),
+            "no_withhold": True,
+            "account_withhold_rent_id": self.withhold_account.id,
+            "account_withhold_iva_id": self.withhold_account.id,
+            "line_ids": [
+                Command.create({
+                    "recap_id": recap.id,
+                    "base": 100.0,
+                    "commission": 4.0,
+                    "commission_iva": 0.48,
+                    "rent_withhold": 1.0,
+                    "issuer_id": self.issuer.id,
+                    "card_type": "credit",
+                })
+                for recap in recaps
+            ],
+            **vals,
+        })
+
+    def test_totals(self):
+        liquidations = self._create_liquidation(self.recaps[:2]) | self._create_liquidation(self.recaps[2:3])
+        liquidations.invalidate_recordset()
+        self.assertRecordValues(liquidations, [
+            {"base": 200.0, "commission": 8.0, "commission_iva": 0.96, "rent_withhold": 2.0, "net_value": 189.04},
+            {"base": 100.0, "commission": 4.0, "commission_iva": 0.48, "rent_withhold": 1.0, "net_value": 94.52},
+        ])
+
+    def test_bulk_confirmation_isolates_failures(self):
+        good = self._create_liquidation(self.recaps[0])
+        good.invoice_id = self._create_commission_entry(4.48)
+        bad = self._create_liquidation(self.recaps[1], journal_id=self.restricted_journal.id)
+        bad.invoice_id = self._create_commission_entry(4.48)
+        other = self._create_liquidation(self.recaps[2])
+        other.invoice_id = self._create_commission_entry(4.48)
+        empty = self._create_liquidation(self.recaps.browse())
+        empty.invoice_id = self._create_commission_entry(4.48)
+
+        report = (good | bad | other | empty)._confirm_liquidations()
+
+        self.assertEqual(report["done"], (good | other).ids)
+        failures = {failure["id"]: failure for failure in report["failed"]}
+        self.assertEqual(set(failures), {bad.id, empty.id})
+        self.assertEqual(failures[empty.id]["number"], "/")
+        self.assertIn("at least one line", failures[empty.id]["error"])
+        self.assertEqual(failures[bad.id]["number"], bad.number)
+        self.assertTrue(failures[bad.id]["error"])
+        self.assertEqual((good | other).mapped("state"), ["done", "done"])
+        self.assertEqual((bad | empty).mapped("state"), ["draft", "draft"])
+        self.assertFalse(bad.move_id)
+        # Numbers are reserved in one batch, in the order of the liquidations
+        numbers = [int(number[-4:]) for number in (good | bad | other).mapped("number")]
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 3)))
+        self.assertEqual(empty.number, "/")
+        # Only the confirmed liquidations settle their invoices and RECAPs
+        self.assertAlmostEqual(self._get_payable_residual(good.invoice_id), 0.0)
+        self.assertAlmostEqual(self._get_payable_residual(other.invoice_id), 0.0)
+        self.assertAlmostEqual(self._get_payable_residual(bad.invoice_id), -4.48)
+        self.assertEqual(self.recaps[:3].mapped("amount_not_reconciled"), [0.0, 100.0, 0.0])
+
+    def test_confirm_partial_single_invoice(self):
+        liquidation = self._create_liquidation(self.recaps[0])
+        liquidation.invoice_id = self._create_commission_entry(10.0)
+        liquidation.action_done()
+        self.assertEqual(liquidation.state, "done")
+        self.assertAlmostEqual(self._get_payable_residual(liquidation.invoice_id), -5.52)
+
+    def test_confirm_multi_invoice(self):
+        liquidation = self._create_liquidation(self.recaps[:2])
+        invoices = self._create_commission_entry(5.0) | self._create_commission_entry(10.0)
+        liquidation.line_invoice_ids = [
+            Command.create({"invoice_id": invoices[0].id, "amount": 5.0}),
+            Command.create({"invoice_id": invoices[1].id, "amount": 3.96}),
+        ]
+        liquidation.action_done()
+        self.assertEqual(liquidation.state, "done")
+        self.assertAlmostEqual(self._get_payable_residual(invoices[0]), 0.0)
+        self.assertAlmostEqual(self._get_payable_residual(invoices[1]), -6.04)
+
+    def test_cancel_done_and_draft(self):
+        done = self._create_liquidation(self.recaps[0])
+        done.invoice_id = self._create_commission_entry(4.48)
+        done.action_done()
+        draft = self._create_liquidation(self.recaps[1])
+        (done | draft).action_cancel()
+        self.assertEqual((done | draft).mapped("state"), ["cancel", "cancel"])
+        self.assertFalse(done.move_id.exists())
+        self.assertAlmostEqual(self._get_payable_residual(done.invoice_id), -4.48)
+        self.assertEqual(self.recaps[0].amount_not_reconciled, 100.0)
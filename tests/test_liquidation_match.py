@@ -0,0 +1,30 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged("post_install", "-at_install")
+class TestLiquidationMatch(TransactionCase):
+
+    def _select(self, amounts, target):
+        candidates = [
+            {"id": index, "amount_not_reconciled": amount} for index, amount in enumerate(amounts)
+        ]
+        match_model = self.env["account.credit.card.liquidation.match"]
+        selected = match_model._select_recaps(candidates, match_model._to_cents(target))
+        return [recap["id"] for recap in selected]
+
+    def test_oldest_recaps_exact(self):
+        self.assertEqual(self._select([10.0, 20.0, 30.0], 30.0), [0, 1])
+
+    def test_subset_sum(self):
+        self.assertEqual(self._select([50.0, 10.0, 7.5, 20.0], 30.0), [1, 3])
+
+    def test_greedy_without_exact_combination(self):
+        self.assertEqual(self._select([50.0, 10.0, 25.0], 30.0), [1])
+
+    def test_greedy_when_search_is_too_long(self):
+        with patch(
+            "odoo.addons.l10n_ec_liquitadion_credit_card.models.credit_card_liquidation_match._MATCH_MAX_STEPS", 2
+        ):
+            self.assertEqual(self._select([50.0, 10.0, 7.5, 20.0], 30.0), [1, 2])
@@ -0,0 +1,75 @@
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged("post_install", "-at_install")
+class TestPaymentRecap(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls, chart_template_ref=None):
+        super().setUpClass(chart_template_ref=chart_template_ref)
+        cls.authorizer = cls.env["account.credit.card.authorizer"].create({
+            "name": "DF",
+            "partner_id": cls.partner_b.id,
+        })
+        cls.journal_1 = cls.env["account.journal"].create({
+            "name": "Credit Cards 1",
+            "code": "BTC1",
+            "type": "bank",
+            "is_payment_tc": True,
+        })
+        cls.journal_2 = cls.env["account.journal"].create({
+            "name": "Credit Cards 2",
+            "code": "BTC2",
+            "type": "bank",
+            "is_payment_tc": True,
+        })
+
+    def _create_payments(self, batches):
+        return self.env["account.payment"].create([
+            {
+                "payment_type": "inbound",
+                "partner_type": "customer",
+                "partner_id": self.partner_a.id,
+                "journal_id": journal.id,
+                "amount": 100.0,
+                "l10n_ec_authorizer_id": self.authorizer.id,
+                "l10n_ec_authorization_cc": "A%s%s" % (batch, index),
+                "l10n_ec_voucher_number": "V%s%s" % (batch, index),
+                "l10n_ec_voucher_batch_number": batch,
+            }
+            for index, (batch, journal) in enumerate(batches)
+        ])
+
+    def _create_recap(self, name, journal, state):
+        return self.env["account.payment.recap"].create({
+            "name": name,
+            "journal_id": journal.id,
+            "authorizer_id": self.authorizer.id,
+            "state": state,
+        })
+
+    def test_recaps_resolved_per_batch_and_journal(self):
+        recap_1 = self._create_recap("A", self.journal_1, "done")
+        other_recap = self._create_recap("A", self.journal_2, "done")
+        payments = self._create_payments([
+            ("A", self.journal_1),
+            ("A", self.journal_1),
+            ("B", self.journal_2),
+        ])
+        payments.action_post()
+        self.assertEqual(payments[0].l10n_ec_recap_id, recap_1)
+        self.assertEqual(payments[1].l10n_ec_recap_id, recap_1)
+        self.assertEqual(recap_1.state, "draft")
+        recap_2 = payments[2].l10n_ec_recap_id
+        self.assertEqual((recap_2.name, recap_2.journal_id), ("B", self.journal_2))
+        # The recap of the same number on the other journal is left alone
+        self.assertEqual(other_recap.state, "done")
+
+    def test_cancelled_recap_number(self):
+        self._create_recap("C", self.journal_1, "cancel")
+        payments = self._create_payments([("C", self.journal_1)])
+        with self.assertRaisesRegex(UserError, "was cancelled"):
+            payments.action_post()